@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into micro-batches for a batched model call.
+
+    The first queued item opens a batch; the batch is dispatched once it holds
+    `max_batch_size` items or `max_wait_ms` has passed, whichever comes first.
+    `predict_batch` runs in a dedicated worker thread so the event loop keeps
+    accepting requests while the model is busy, and it must return one result
+    per input, in order; any other count fails the whole batch. Requests still
+    waiting when the batcher stops fail rather than hang.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch: List[Tuple[Any, asyncio.Future]] = []  # collected, not yet answered
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-inference")
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        pending, self._batch = self._batch, []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = None
+        self._fail(pending, RuntimeError("Batcher stopped."))
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its result from the next batch."""
+        if self._queue is None:
+            raise RuntimeError("Batcher has not been started.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    @staticmethod
+    def _fail(batch, error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _collect(self):
+        batch = self._batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (client disconnects) don't need a forward pass
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            self._batch = batch
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.predict_batch, [item for item, _ in batch]
+                )
+                if len(results) != len(batch):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} inputs.")
+            except Exception as e:
+                self._fail(batch, e)
+                self._batch = []
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._batch = []
@@ -1,18 +1,29 @@
+import os
 import torch
 import requests
 from PIL import Image
 from transformers import AutoImageProcessor, AutoModelForImageClassification
 
-# --- Model and Processor Loading ---
-# We use the same multi-class clothing model.
-print("Loading the model and processor... This might take a moment.")
-try:
-    processor = AutoImageProcessor.from_pretrained("dima806/clothes_image_detection")
-    model = AutoModelForImageClassification.from_pretrained("dima806/clothes_image_detection")
+MODEL_NAME = "dima806/clothes_image_detection"
+# The weights clothes_model_api.py bakes; read from there when present, so no download
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "model_cache", "clothes_image_detection"))
+
+model = None
+processor = None
+
+def load_model():
+    """
+    Loads the model on first use rather than at import, so importing this module is cheap.
+    """
+    global model, processor
+    if model is not None:
+        return
+    source = MODEL_DIR if os.path.isdir(MODEL_DIR) else MODEL_NAME
+    print(f"Loading the model and processor from {source}... This might take a moment.")
+    processor = AutoImageProcessor.from_pretrained(source)
+    model = AutoModelForImageClassification.from_pretrained(source)
+    model.eval()
     print("Model and processor loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    exit()
 
 def is_image_clothing(image_source: str, confidence_threshold: float = 0.50):
     """
@@ -28,6 +39,8 @@ def is_image_clothing(image_source: str, confidence_threshold: float = 0.50):
         dict: A dictionary with the result, the model's top guess, and the confidence score.
     """
     try:
+        load_model()
+
         # 1. Load the image from URL or local file
         if image_source.startswith(('http://', 'https://')):
             image = Image.open(requests.get(image_source, stream=True).raw).convert("RGB")
@@ -61,6 +74,12 @@ def is_image_clothing(image_source: str, confidence_threshold: float = 0.50):
 
 # --- Main execution block ---
 if __name__ == "__main__":
+    try:
+        load_model()
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        exit()
+
     # You can adjust this threshold based on your needs.
     # A higher value (e.g., 0.8) is stricter.
     # A lower value (e.g., 0.3) is more lenient.
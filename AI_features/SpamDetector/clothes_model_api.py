@@ -1,68 +1,244 @@
 
+import asyncio
+import gc
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
 import torch
-import requests
 from PIL import Image
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from transformers import AutoImageProcessor, AutoModelForImageClassification
 
+from batcher import MicroBatcher
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from shared.image_loader import IMAGE_MAX_BYTES, ImageFetchError, ImageLoader, decode_image
+from shared.result_cache import ResultCache, content_hash
+from shared.onnx_backend import INFERENCE_BACKEND, backend_tag, build_onnx_model, parity_images
+
+
+MODEL_NAME = "dima806/clothes_image_detection"
+# Weights are read from here; run `python clothes_model_api.py` once (e.g. at image build) to bake them
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "model_cache", "clothes_image_detection"))
+# Load weights at import so a pre-forking server (gunicorn --preload) shares them copy-on-write
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+# Part of every cache key: bump it when the weights or preprocessing change. Defaults to
+# the model name and the backend actually serving (see model_version())
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+
+# Dynamic batching: concurrent requests are grouped into one forward pass
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+CONFIDENCE_THRESHOLD = 0.10
+MAX_IMAGES_PER_BATCH_REQUEST = int(os.getenv("MAX_IMAGES_PER_BATCH_REQUEST", "256"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await image_loader.start()
+    await batcher.start()
+    # Loading runs in the background so the server is up immediately and /ready reports progress
+    loading = asyncio.create_task(asyncio.to_thread(start_inference))
+    yield
+    loading.cancel()
+    await batcher.stop()
+    await image_loader.close()
+
 
 app = FastAPI(
     title="Clothing Detection API",
     description="An API to detect if an image contains clothing or not.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
-try:
-    print("Loading model from Hugging Face... This might take a moment.")
-    processor = AutoImageProcessor.from_pretrained("dima806/clothes_image_detection")
-    model = AutoModelForImageClassification.from_pretrained("dima806/clothes_image_detection")
-    print("Model loaded successfully and is ready to receive requests.")
-except Exception as e:
-    
-    print(f"FATAL: Could not load model. Error: {e}")
-    
-    model = None
-    processor = None
+model = None
+processor = None
+compute_logits = None
+# "onnx" once the ONNX model passed its parity check, otherwise "torch"
+active_backend = "torch"
+
+
+def load_models():
+    """
+    Loads the weights from MODEL_DIR. If they haven't been baked yet, downloads them from
+    Hugging Face once and saves them there, so later boots need no network.
+    """
+    global model, processor
+    if model is not None:
+        return
+    try:
+        if os.path.isdir(MODEL_DIR):
+            print(f"Loading model from {MODEL_DIR}...")
+            processor = AutoImageProcessor.from_pretrained(MODEL_DIR)
+            model = AutoModelForImageClassification.from_pretrained(MODEL_DIR)
+        else:
+            print("Loading model from Hugging Face... This might take a moment.")
+            processor = AutoImageProcessor.from_pretrained(MODEL_NAME)
+            model = AutoModelForImageClassification.from_pretrained(MODEL_NAME)
+            processor.save_pretrained(MODEL_DIR)
+            model.save_pretrained(MODEL_DIR)
+        model.eval()
+        print("Model loaded successfully.")
+    except Exception as e:
+        
+        print(f"FATAL: Could not load model. Error: {e}")
+        
+        model = None
+        processor = None
+
+
+def start_inference():
+    """
+    Per-process setup: weights (unless preloaded by the parent), the inference backend and
+    the result cache. None of them is built in a pre-fork parent, since ONNX Runtime and
+    OpenMP thread pools, and SQLite handles, don't survive a fork.
+
+    The cache is opened only once the backend is known, since its key names the backend.
+    """
+    global compute_logits, active_backend, result_cache
+    load_models()
+    backend, logits = load_inference_backend()
+    result_cache = ResultCache("clothing-detection", model_version(backend))
+    active_backend = backend
+    compute_logits = logits
+    if model is not None:
+        print("Model is ready to receive requests.")
+
+
+if PRELOAD_MODELS:
+    load_models()
+    # Keep the loaded objects out of GC passes, which would otherwise touch (and copy) their pages
+    gc.freeze()
+
+
+class LogitsOnly(torch.nn.Module):
+    """
+    Exposes the Hugging Face model as pixel_values -> logits, which is what gets exported to ONNX.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def torch_logits(pixel_values: torch.Tensor) -> torch.Tensor:
+    with torch.no_grad():
+        return model(pixel_values=pixel_values).logits
+
+
+def load_inference_backend():
+    """
+    Picks the backend and its function computing logits, per INFERENCE_BACKEND. The ONNX
+    model has to pass a parity check against PyTorch, otherwise the PyTorch path is kept.
+    """
+    if not model or INFERENCE_BACKEND != "onnx":
+        return "torch", torch_logits
+    try:
+        sample = processor(images=parity_images(), return_tensors="pt")["pixel_values"]
+        onnx_model = build_onnx_model("clothes_image_detection", LogitsOnly(model), sample, "pixel_values")
+    except Exception as e:
+        print(f"ONNX backend unavailable, falling back to PyTorch. Error: {e}")
+        return "torch", torch_logits
+    return "onnx", lambda pixel_values: torch.from_numpy(onnx_model(pixel_values.numpy()))
+
+
+def model_version(backend: str) -> str:
+    return MODEL_VERSION or f"{MODEL_NAME}:{backend_tag(backend)}"
 
 
 class ImageRequest(BaseModel):
     image_url: HttpUrl
 
 
-def check_if_clothing(image_source: str, confidence_threshold: float = 0.10):
+class BatchImageRequest(BaseModel):
+    image_urls: List[HttpUrl]
+
+
+def is_ready() -> bool:
+    return model is not None and processor is not None and compute_logits is not None
+
+
+def ensure_ready():
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Model is not loaded yet. Check /ready.")
+
+
+def classify_images(images: List[Image.Image]) -> List[float]:
     """
-    The core logic to classify an image and determine if it's clothing.
+    Runs one batched forward pass and returns the top-class probability for each image.
     """
-    if not model or not processor:
+    if not is_ready():
         raise RuntimeError("Model is not loaded. The application cannot process requests.")
-        
-    try:
-        
-        image = Image.open(requests.get(image_source, stream=True).raw).convert("RGB")
 
-        
-        inputs = processor(images=image, return_tensors="pt")
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        logits = outputs.logits
-        
-        
-        probabilities = torch.nn.functional.softmax(logits, dim=-1)
-        top_prob = probabilities.max().item()
+    inputs = processor(images=images, return_tensors="pt")
+    logits = compute_logits(inputs["pixel_values"])
+
+    probabilities = torch.nn.functional.softmax(logits, dim=-1)
+    return probabilities.max(dim=-1).values.tolist()
 
-        
-        is_clothing = top_prob >= confidence_threshold
 
-        return {
-            "is_clothing": is_clothing,
-            "confidence": top_prob
-        }
-    except requests.exceptions.RequestException as e:
+batcher = MicroBatcher(classify_images, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+image_loader = ImageLoader()
+result_cache: Optional[ResultCache] = None
+
+
+async def classify_bytes(data: bytes, url: Optional[str] = None) -> float:
+    """
+    Top-class probability for an image, reusing the cached result for identical bytes.
+    The cache's SQLite tier blocks (disk I/O, eviction, lock waits), so it runs in a thread.
+    """
+    digest = content_hash(data)
+    top_prob = await asyncio.to_thread(result_cache.get_by_content, digest)
+    if top_prob is not None:
+        if url:
+            await asyncio.to_thread(result_cache.remember_url, url, digest)
+        return top_prob
+    image = await asyncio.to_thread(decode_image, data)
+    top_prob = await batcher.submit(image)
+    await asyncio.to_thread(result_cache.put, digest, top_prob, url=url)
+    return top_prob
+
+
+async def classify_url(url: str) -> float:
+    """
+    Like classify_bytes, but a recently seen URL skips the download as well.
+    """
+    top_prob = await asyncio.to_thread(result_cache.get_by_url, url)
+    if top_prob is not None:
+        return top_prob
+    return await classify_bytes(await image_loader.fetch_bytes(url), url)
+
+
+def to_result(top_prob: float, confidence_threshold: float = CONFIDENCE_THRESHOLD):
+    return {
+        "is_clothing": top_prob >= confidence_threshold,
+        "confidence": top_prob
+    }
+
+
+async def check_if_clothing(image_source: str, confidence_threshold: float = CONFIDENCE_THRESHOLD):
+    """
+    The core logic to classify an image and determine if it's clothing.
+    The forward pass is shared with concurrent requests through the batcher.
+    """
+    ensure_ready()
         
-        raise HTTPException(status_code=400, detail=f"Could not retrieve image from URL: {e}")
+    try:
+        top_prob = await classify_url(image_source)
+        return to_result(top_prob, confidence_threshold)
+    except ImageFetchError as e:
+        
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
@@ -75,7 +251,7 @@ async def detect_clothing_endpoint(request: ImageRequest):
     
     - **image_url**: The public URL of the image to analyze.
     """
-    result = check_if_clothing(str(request.image_url)) # Convert HttpUrl to string
+    result = await check_if_clothing(str(request.image_url)) # Convert HttpUrl to string
     
    
     if result["is_clothing"]:
@@ -88,6 +264,99 @@ async def detect_clothing_endpoint(request: ImageRequest):
         "confidence": result["confidence"]
     }
 
+def to_response(result):
+    return {
+        "result": "clothing" if result["is_clothing"] else "not clothing",
+        "confidence": result["confidence"]
+    }
+
+
+async def classify_one(index: int, source: str, classification):
+    """
+    Awaits one image of a batch request, reporting failures per image.
+    """
+    try:
+        top_prob = await classification
+        return {"index": index, "source": source, **to_response(to_result(top_prob))}
+    except Exception as e:
+        return {"index": index, "source": source, "error": str(e)}
+
+
+def ensure_batch_size(count: int):
+    if count > MAX_IMAGES_PER_BATCH_REQUEST:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_IMAGES_PER_BATCH_REQUEST} images per request.")
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """
+    The bytes of one uploaded image, under the same IMAGE_MAX_BYTES limit as URL downloads.
+    """
+    data = await file.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: image is larger than {IMAGE_MAX_BYTES} bytes.")
+    return data
+
+
+def stream_results(jobs):
+    """
+    Runs all jobs concurrently so their images share batches, and emits an NDJSON
+    line per image as soon as it is classified (so lines arrive out of order).
+    """
+    async def lines():
+        tasks = [asyncio.ensure_future(job) for job in jobs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/detect-clothing/batch")
+async def detect_clothing_batch_endpoint(request: BatchImageRequest):
+    """
+    Classifies many image URLs in one call, streaming one NDJSON result per image.
+
+    - **image_urls**: The public URLs of the images to analyze.
+    """
+    ensure_ready()
+    ensure_batch_size(len(request.image_urls))
+    urls = [str(url) for url in request.image_urls]
+    return stream_results([
+        classify_one(index, url, classify_url(url)) for index, url in enumerate(urls)
+    ])
+
+
+@app.post("/detect-clothing/batch/upload")
+async def detect_clothing_batch_upload_endpoint(files: List[UploadFile] = File(...)):
+    """
+    Same as /detect-clothing/batch, for uploaded image files.
+    """
+    ensure_ready()
+    ensure_batch_size(len(files))
+    uploads = [(file.filename, await read_upload(file)) for file in files]
+    return stream_results([
+        classify_one(index, name, classify_bytes(data)) for index, (name, data) in enumerate(uploads)
+    ])
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """
+    Readiness probe: 200 once the model can serve requests, 503 while it is loading.
+    """
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Model is loading.")
+    return {"status": "ready", "backend": backend_tag(active_backend)}
+
+
 @app.get("/", include_in_schema=False)
 async def root():
-    return {"message": "Welcome to the Clothing Detection API! Go to /docs for more info."}
\ No newline at end of file
+    return {"message": "Welcome to the Clothing Detection API! Go to /docs for more info."}
+
+
+if __name__ == "__main__":
+    # Bakes the weights into MODEL_DIR, e.g. as a Docker build step
+    load_models()
\ No newline at end of file
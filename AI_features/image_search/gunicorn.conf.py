@@ -0,0 +1,21 @@
+# gunicorn -c gunicorn.conf.py main:app
+#
+# The app is imported once in the master with the weights loaded, then forked, so all
+# workers share one copy of the model pages copy-on-write instead of loading their own.
+import os
+
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+preload_app = True
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# The Backend (port 8000) looks for this service here by default (EMBEDDING_SERVICE_URL)
+bind = os.getenv("BIND", "0.0.0.0:8001")
+
+
+def post_fork(server, worker):
+    # The master connected to Postgres while creating the tables; each worker opens its own
+    # connections, without closing the parent's sockets that the other workers inherited too
+    from main import engine
+
+    engine.dispose(close=False)
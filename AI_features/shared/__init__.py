@@ -0,0 +1 @@
+# Helpers shared by the AI_features services
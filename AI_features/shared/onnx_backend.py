@@ -0,0 +1,147 @@
+import fcntl
+import os
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+
+# "torch" keeps the eager PyTorch path; "onnx" exports the model and runs it with ONNX Runtime
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "0") == "1"
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 lets ONNX Runtime decide
+# Below this top-1 agreement with PyTorch the ONNX model is rejected
+ONNX_MIN_TOP1_AGREEMENT = float(os.getenv("ONNX_MIN_TOP1_AGREEMENT", "0.99"))
+
+
+def backend_tag(backend: str = INFERENCE_BACKEND) -> str:
+    """
+    Describes a backend ("torch" or "onnx"), for cache keys and logs. Pass the one
+    actually serving: a configured ONNX backend can fall back to PyTorch at startup.
+    """
+    if backend != "onnx":
+        return "torch-fp32"
+    return "onnx-int8" if ONNX_QUANTIZE else "onnx-fp32"
+
+
+def export_to_onnx(model, example_input, path: str, input_name: str, output_name: str = "logits"):
+    """
+    Exports a PyTorch module taking one tensor, with a dynamic batch dimension.
+    """
+    import torch
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (example_input,),
+            path,
+            input_names=[input_name],
+            output_names=[output_name],
+            dynamic_axes={input_name: {0: "batch"}, output_name: {0: "batch"}},
+            opset_version=17,
+            # The TorchScript exporter writes a single self-contained file that
+            # onnxruntime's quantizer handles reliably
+            dynamo=False,
+        )
+
+
+def quantize_int8(source_path: str, target_path: str):
+    """
+    Dynamic int8 quantization: weights are stored as int8, activations quantized at run time.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QInt8)
+
+
+class OnnxModel:
+    def __init__(self, path: str, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+
+
+def compare_outputs(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Parity between two (batch, classes) outputs: worst absolute difference and top-1 agreement.
+    """
+    return {
+        "max_abs_diff": float(np.max(np.abs(reference - candidate))),
+        "top1_agreement": float(np.mean(reference.argmax(-1) == candidate.argmax(-1))),
+    }
+
+
+def parity_images(count: int = 8, size: int = 224) -> List:
+    """
+    Images for the parity check: files from ONNX_PARITY_IMAGES if set, random noise otherwise.
+    """
+    from PIL import Image
+
+    directory = os.getenv("ONNX_PARITY_IMAGES")
+    if directory:
+        names = sorted(os.listdir(directory))[:count]
+        return [Image.open(os.path.join(directory, name)).convert("RGB") for name in names]
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+@contextmanager
+def _building(path: str):
+    """
+    Serialises builds of `path` across processes (every worker builds at startup) and
+    yields a temporary path to write, moved into place only once it is complete.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(path):
+            yield None
+            return
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            yield temporary
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def build_onnx_model(name: str, torch_model, sample_batch, input_name: str) -> OnnxModel:
+    """
+    Exports (and optionally quantizes) a model once into ONNX_MODEL_DIR, then checks it
+    against the PyTorch path on `sample_batch`.
+
+    `torch_model` must map one input tensor to output logits. Raises RuntimeError if the
+    ONNX model disagrees with PyTorch too often, so callers can fall back to PyTorch.
+    """
+    import torch
+
+    fp32_path = os.path.join(ONNX_MODEL_DIR, f"{name}.onnx")
+    with _building(fp32_path) as temporary:
+        if temporary:
+            export_to_onnx(torch_model, sample_batch[:1], temporary, input_name)
+    path = fp32_path
+    if ONNX_QUANTIZE:
+        path = os.path.join(ONNX_MODEL_DIR, f"{name}.int8.onnx")
+        with _building(path) as temporary:
+            if temporary:
+                quantize_int8(fp32_path, temporary)
+
+    onnx_model = OnnxModel(path)
+    with torch.no_grad():
+        reference = torch_model(sample_batch).numpy()
+    report = compare_outputs(reference, onnx_model(sample_batch.numpy()))
+    print(f"ONNX parity for {name} ({backend_tag()}): {report}")
+    if report["top1_agreement"] < ONNX_MIN_TOP1_AGREEMENT:
+        raise RuntimeError(f"ONNX model for {name} failed the parity check: {report}")
+    return onnx_model
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite3")
+RESULT_CACHE_MEMORY_ITEMS = int(os.getenv("RESULT_CACHE_MEMORY_ITEMS", "10000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# How long a URL is trusted to still serve the bytes we hashed for it
+RESULT_CACHE_URL_TTL = float(os.getenv("RESULT_CACHE_URL_TTL", str(24 * 3600)))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class _LRU:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+
+class ResultCache:
+    """
+    Two-tier cache of model outputs, keyed by the content hash of the image bytes.
+
+    Results are stored per (namespace, model_version, sha256 of the bytes), so the
+    same picture re-uploaded under a new URL still skips the forward pass, and a new
+    model version never sees entries written by an old one. A URL -> hash map lets
+    a repeated URL skip the download as well, for up to url_ttl seconds.
+
+    The first tier is an in-process LRU; the second is a SQLite file shared by
+    restarts and workers, evicted least-recently-used once it exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        model_version: str,
+        path: str = RESULT_CACHE_PATH,
+        memory_items: int = RESULT_CACHE_MEMORY_ITEMS,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        url_ttl: float = RESULT_CACHE_URL_TTL,
+    ):
+        self.namespace = namespace
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+        self.url_ttl = url_ttl
+        self._results = _LRU(memory_items)
+        self._urls = _LRU(memory_items)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (namespace TEXT, model_version TEXT, digest TEXT, "
+            "value TEXT, size INTEGER, last_access REAL, PRIMARY KEY (namespace, model_version, digest))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS urls (namespace TEXT, url TEXT, digest TEXT, fetched_at REAL, "
+            "PRIMARY KEY (namespace, url))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_results_last_access ON results (last_access)")
+        # Entries from other model versions can never be hit again
+        self._db.execute(
+            "DELETE FROM results WHERE namespace = ? AND model_version != ?", (namespace, model_version)
+        )
+        # Running estimate of the file's payload size; recounted exactly before evicting
+        (self._approx_bytes,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+
+    def get_by_url(self, url: str) -> Optional[Any]:
+        """
+        Result for a URL seen recently, without downloading it again.
+        """
+        digest = self._digest_for_url(url)
+        return self.get_by_content(digest) if digest else None
+
+    def get_by_content(self, digest: str) -> Optional[Any]:
+        with self._lock:
+            value = self._results.get(digest)
+            if value is not None:
+                return value
+            row = self._db.execute(
+                "SELECT value FROM results WHERE namespace = ? AND model_version = ? AND digest = ?",
+                (self.namespace, self.model_version, digest),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE results SET last_access = ? WHERE namespace = ? AND model_version = ? AND digest = ?",
+                (time.time(), self.namespace, self.model_version, digest),
+            )
+            value = json.loads(row[0])
+            self._results.put(digest, value)
+            return value
+
+    def put(self, digest: str, value: Any, url: Optional[str] = None):
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._results.put(digest, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, self.model_version, digest, encoded, len(encoded), now),
+            )
+            if url:
+                self._urls.put(url, (digest, now))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)", (self.namespace, url, digest, now)
+                )
+            self._approx_bytes += len(encoded)
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def remember_url(self, url: str, digest: str):
+        """
+        Point a URL at a result that is already cached, e.g. after a content-cache hit.
+        """
+        now = time.time()
+        with self._lock:
+            self._urls.put(url, (digest, now))
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)", (self.namespace, url, digest, now))
+
+    def _digest_for_url(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is None:
+                entry = self._db.execute(
+                    "SELECT digest, fetched_at FROM urls WHERE namespace = ? AND url = ?", (self.namespace, url)
+                ).fetchone()
+                if entry is None:
+                    return None
+                self._urls.put(url, tuple(entry))
+        digest, fetched_at = entry
+        return digest if time.time() - fetched_at < self.url_ttl else None
+
+    def _evict(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so eviction doesn't run again on the very next insert
+        excess = total - int(self.max_bytes * 0.9)
+        stale = self._db.execute("SELECT namespace, model_version, digest, size FROM results ORDER BY last_access")
+        doomed = []
+        for namespace, model_version, digest, size in stale:
+            doomed.append((namespace, model_version, digest))
+            excess -= size
+            self._approx_bytes -= size
+            if excess <= 0:
+                break
+        self._db.executemany(
+            "DELETE FROM results WHERE namespace = ? AND model_version = ? AND digest = ?", doomed
+        )
+        self._db.execute(
+            "DELETE FROM urls WHERE NOT EXISTS (SELECT 1 FROM results r WHERE r.namespace = urls.namespace "
+            "AND r.digest = urls.digest)"
+        )
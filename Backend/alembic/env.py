@@ -42,7 +42,8 @@ def run_migrations_offline() -> None:
 
     """
     from app.core.config import settings
-    url = settings.DATABASE_URL
+    from app.db.url import sync_database_url
+    url = sync_database_url(settings.DATABASE_URL).render_as_string(hide_password=False)
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -62,7 +63,8 @@ def run_migrations_online() -> None:
 
     """
     from sqlalchemy import create_engine
-    connectable = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    from app.db.url import sync_database_url
+    connectable = create_engine(sync_database_url(settings.DATABASE_URL), poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
         context.configure(
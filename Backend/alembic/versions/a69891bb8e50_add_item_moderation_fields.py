@@ -0,0 +1,32 @@
+"""add item moderation fields
+
+Revision ID: a69891bb8e50
+Revises: f1a4c7d92e35
+Create Date: 2026-10-18 19:12:45.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a69891bb8e50'
+down_revision: Union[str, Sequence[str], None] = 'f1a4c7d92e35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('items', sa.Column('moderation_score', sa.Float(), nullable=True))
+    op.add_column('items', sa.Column('moderation_label', sa.String(), nullable=True))
+    op.create_index('ix_items_status_moderation_label', 'items', ['status', 'moderation_label'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_status_moderation_label', table_name='items')
+    op.drop_column('items', 'moderation_label')
+    op.drop_column('items', 'moderation_score')
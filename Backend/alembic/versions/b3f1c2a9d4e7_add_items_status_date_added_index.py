@@ -0,0 +1,38 @@
+"""add items status date_added index
+
+Revision ID: b3f1c2a9d4e7
+Revises: 7dea0e0abade
+Create Date: 2026-10-18 09:12:41.203118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2a9d4e7'
+down_revision: Union[str, Sequence[str], None] = '7dea0e0abade'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination compares (date_added, id) row values, which NULLs would break.
+    # Undated legacy items sorted last, so they take the oldest date there is.
+    op.execute(
+        "UPDATE items SET date_added = COALESCE((SELECT MIN(date_added) FROM items), CURRENT_TIMESTAMP) "
+        "WHERE date_added IS NULL"
+    )
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.alter_column('date_added', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_items_status_date_added_id', 'items', ['status', 'date_added', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_status_date_added_id', table_name='items')
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.alter_column('date_added', existing_type=sa.DateTime(), nullable=True)
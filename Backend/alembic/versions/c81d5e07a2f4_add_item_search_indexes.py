@@ -0,0 +1,40 @@
+"""add item search indexes
+
+Revision ID: c81d5e07a2f4
+Revises: b3f1c2a9d4e7
+Create Date: 2026-10-18 10:03:17.554820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.item import search_index_statements
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d5e07a2f4'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c2a9d4e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_items_status_category', 'items', ['status', 'category'], unique=False)
+    # Shared with create_all, so both build the same FTS5 table/triggers or GIN index
+    for statement in search_index_statements(op.get_bind().dialect.name):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('items_fts_ai', 'items_fts_ad', 'items_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS items_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_items_search_tsv', table_name='items')
+    op.drop_index('ix_items_status_category', table_name='items')
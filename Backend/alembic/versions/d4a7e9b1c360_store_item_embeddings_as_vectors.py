@@ -0,0 +1,75 @@
+"""store item embeddings as vectors
+
+Revision ID: d4a7e9b1c360
+Revises: c81d5e07a2f4
+Create Date: 2026-10-18 11:26:52.918344
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.types import pack_embedding, unpack_embedding
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e9b1c360'
+down_revision: Union[str, Sequence[str], None] = 'c81d5e07a2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        # One vector of another length would abort the cast for the whole table; drop those
+        # (and anything that isn't a JSON array), the embedding workers recompute them
+        op.execute(
+            "UPDATE items SET embeddings = NULL WHERE embeddings IS NOT NULL AND CASE "
+            "WHEN embeddings ~ '^\\s*\\[.*\\]\\s*$' "
+            f"THEN json_array_length(embeddings::json) <> {settings.EMBEDDING_DIM} ELSE true END"
+        )
+        # pgvector parses the '[x, y, ...]' text that json.dumps produced
+        op.execute(
+            f"ALTER TABLE items ALTER COLUMN embeddings TYPE vector({settings.EMBEDDING_DIM}) "
+            "USING NULLIF(embeddings, '')::vector"
+        )
+        op.execute("CREATE INDEX ix_items_embeddings_hnsw ON items USING hnsw (embeddings vector_cosine_ops)")
+    else:
+        # SQLite keeps BLOBs regardless of column affinity, so the data is converted in place
+        # rather than rebuilding the table (which would drop the FTS triggers)
+        rows = bind.execute(sa.text("SELECT id, embeddings FROM items WHERE typeof(embeddings) = 'text'")).fetchall()
+        for item_id, raw in rows:
+            try:
+                values = json.loads(raw) if raw else None
+            except json.JSONDecodeError:
+                values = None
+            if (
+                not isinstance(values, list) or len(values) != settings.EMBEDDING_DIM
+                or not all(isinstance(v, (int, float)) for v in values)
+            ):
+                values = None  # recomputed by the embedding workers
+            bind.execute(
+                sa.text("UPDATE items SET embeddings = :blob WHERE id = :id"),
+                {"blob": pack_embedding(values) if values else None, "id": item_id},
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_items_embeddings_hnsw")
+        op.execute("ALTER TABLE items ALTER COLUMN embeddings TYPE text USING embeddings::text")
+    else:
+        rows = bind.execute(sa.text("SELECT id, embeddings FROM items WHERE typeof(embeddings) = 'blob'")).fetchall()
+        for item_id, blob in rows:
+            bind.execute(
+                sa.text("UPDATE items SET embeddings = :raw WHERE id = :id"),
+                {"raw": json.dumps(unpack_embedding(blob)), "id": item_id},
+            )
@@ -0,0 +1,46 @@
+"""add stat counters
+
+Revision ID: e6c3f2a18b90
+Revises: d4a7e9b1c360
+Create Date: 2026-10-18 15:02:37.104215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6c3f2a18b90'
+down_revision: Union[str, Sequence[str], None] = 'd4a7e9b1c360'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ITEM_STATUSES = ('available', 'pending', 'swapped', 'rejected')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stat_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    # Seed from the current rows; the app keeps them current from here on
+    op.execute("INSERT INTO stat_counters (name, value) SELECT 'items', COUNT(*) FROM items")
+    for status in ITEM_STATUSES:
+        op.execute(
+            f"INSERT INTO stat_counters (name, value) "
+            f"SELECT 'items:{status}', COUNT(*) FROM items WHERE CAST(status AS VARCHAR) = '{status}'"
+        )
+    op.execute("INSERT INTO stat_counters (name, value) SELECT 'users', COUNT(*) FROM users")
+    op.execute("INSERT INTO stat_counters (name, value) SELECT 'users:admin', COUNT(*) FROM users WHERE is_admin")
+    # Not a total: the change marker of the similarity snapshot (app/core/similarity.py)
+    op.execute("INSERT INTO stat_counters (name, value) VALUES ('items:vector_changes', 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stat_counters')
@@ -0,0 +1,32 @@
+"""add swap and item owner indexes
+
+Revision ID: f1a4c7d92e35
+Revises: e6c3f2a18b90
+Create Date: 2026-10-18 16:40:12.553871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a4c7d92e35'
+down_revision: Union[str, Sequence[str], None] = 'e6c3f2a18b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_swaps_requester_id_status', 'swaps', ['requester_id', 'status'], unique=False)
+    op.create_index('ix_swaps_owner_id_status', 'swaps', ['owner_id', 'status'], unique=False)
+    op.create_index('ix_items_owner_id', 'items', ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_owner_id', table_name='items')
+    op.drop_index('ix_swaps_owner_id_status', table_name='swaps')
+    op.drop_index('ix_swaps_requester_id_status', table_name='swaps')
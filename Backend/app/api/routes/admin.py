@@ -1,60 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.streaming import streaming_listing
+from app.db.pool import pool_status
+from app.db.session import async_engine, engine
 from app.dependencies.deps import get_db
 from app.dependencies.admin import require_admin
 from app.crud import admin as crud_admin
-from app.models.item import ItemStatus
-from app.schemas.item import ItemOut
-from app.schemas.user import UserOut
-from typing import List, Dict, Any
+from app.models.item import Item, ItemStatus
+from app.models.user import User
+from app.schemas.item import ItemOut, ItemPage, BulkStatusUpdate, BulkStatusResult
+from app.schemas.user import UserOut, UserPage
+from typing import List, Dict, Any, Literal, Optional, Union
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+ListingFormat = Literal["json", "ndjson", "csv"]
+
+async def _listing(db: AsyncSession, query, model, schema, cursor: Optional[str], limit: int, format: ListingFormat, filename: str):
+    """Admin listings come in two modes.
+
+    Without `cursor` the whole listing is streamed from a server-side cursor, as a JSON
+    array (the original response shape) or, with `format`, as an NDJSON/CSV export.
+    With `cursor` ('' for the first page, then `next_cursor`) it returns
+    `{"items": [...], "next_cursor": ...}` pages of `limit` rows.
+    """
+    if cursor is None:
+        return streaming_listing(query, schema, format, filename)
+    try:
+        after_id = decode_cursor(cursor)[1] if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows, has_more = await crud_admin.get_page(db, query, model, after_id, limit)
+    return {"items": rows, "next_cursor": encode_cursor(None, rows[-1].id) if has_more else None}
+
 @router.get("/stats", response_model=Dict[str, Any])
-def get_admin_stats(db: Session = Depends(get_db), admin = Depends(require_admin)):
+async def get_admin_stats(db: AsyncSession = Depends(get_db), admin = Depends(require_admin)):
     """Get admin dashboard statistics"""
-    return crud_admin.get_admin_stats(db)
+    return await crud_admin.get_admin_stats(db)
 
-@router.get("/items", response_model=List[ItemOut])
-def get_all_items(db: Session = Depends(get_db), admin = Depends(require_admin)):
+@router.get("/items", response_model=Union[ItemPage, List[ItemOut]])
+async def get_all_items(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    format: ListingFormat = "json",
+    db: AsyncSession = Depends(get_db),
+    admin = Depends(require_admin),
+):
     """Get all items for admin review"""
-    return crud_admin.get_all_items(db)
+    return await _listing(db, crud_admin.items_query(), Item, ItemOut, cursor, limit, format, "items")
 
-@router.get("/items/pending", response_model=List[ItemOut])
-def get_pending_items(db: Session = Depends(get_db), admin = Depends(require_admin)):
-    """Get items pending approval"""
-    return crud_admin.get_pending_items(db)
+@router.get("/items/pending", response_model=Union[ItemPage, List[ItemOut]])
+async def get_pending_items(
+    review_only: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    format: ListingFormat = "json",
+    db: AsyncSession = Depends(get_db),
+    admin = Depends(require_admin),
+):
+    """Get items pending approval.
 
-@router.get("/items/status/{status}", response_model=List[ItemOut])
-def get_items_by_status(status: ItemStatus, db: Session = Depends(get_db), admin = Depends(require_admin)):
+    With moderation enabled this is the review queue: the items the pipeline left
+    uncertain or hasn't labelled yet, least clothing-like first (unscored ones lead).
+    `review_only=false` lists every pending item.
+    """
+    if review_only is None:
+        review_only = settings.MODERATION_ENABLED
+    if not review_only:
+        query = crud_admin.items_query(ItemStatus.pending)
+        return await _listing(db, query, Item, ItemOut, cursor, limit, format, "items-pending")
+    if cursor is None:
+        return streaming_listing(crud_admin.review_queue_query(), ItemOut, format, "items-review")
+    try:
+        after = decode_cursor(cursor, float) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows, has_more = await crud_admin.get_review_page(db, after, limit)
+    next_cursor = encode_cursor(crud_admin.review_sort_value(rows[-1]), rows[-1].id) if has_more else None
+    return {"items": rows, "next_cursor": next_cursor}
+
+@router.get("/items/status/{status}", response_model=Union[ItemPage, List[ItemOut]])
+async def get_items_by_status(
+    status: ItemStatus,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    format: ListingFormat = "json",
+    db: AsyncSession = Depends(get_db),
+    admin = Depends(require_admin),
+):
     """Get items by status"""
-    return crud_admin.get_items_by_status(db, status)
+    query = crud_admin.items_query(status)
+    return await _listing(db, query, Item, ItemOut, cursor, limit, format, f"items-{status.value}")
 
 @router.put("/items/{item_id}/approve", response_model=ItemOut)
-def approve_item(item_id: int, db: Session = Depends(get_db), admin = Depends(require_admin)):
+async def approve_item(item_id: int, db: AsyncSession = Depends(get_db), admin = Depends(require_admin)):
     """Approve an item listing"""
-    item = crud_admin.update_item_status(db, item_id, ItemStatus.available)
+    item = await crud_admin.update_item_status(db, item_id, ItemStatus.available)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 @router.put("/items/{item_id}/reject", response_model=ItemOut)
-def reject_item(item_id: int, db: Session = Depends(get_db), admin = Depends(require_admin)):
+async def reject_item(item_id: int, db: AsyncSession = Depends(get_db), admin = Depends(require_admin)):
     """Reject an item listing"""
-    item = crud_admin.update_item_status(db, item_id, ItemStatus.rejected)
+    item = await crud_admin.update_item_status(db, item_id, ItemStatus.rejected)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
+@router.post("/items/bulk-status", response_model=BulkStatusResult)
+async def bulk_update_item_status(request: BulkStatusUpdate, db: AsyncSession = Depends(get_db), admin = Depends(require_admin)):
+    """Approve, reject or otherwise re-status many items at once, by ID or by filter"""
+    if request.item_ids is not None and len(request.item_ids) > settings.BULK_MODERATION_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MODERATION_MAX_ITEMS} item IDs per request")
+    return await crud_admin.bulk_update_item_status(db, request.status, request.item_ids, request.filter)
+
 @router.delete("/items/{item_id}")
-def delete_item(item_id: int, db: Session = Depends(get_db), admin = Depends(require_admin)):
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_db), admin = Depends(require_admin)):
     """Delete an item completely"""
-    result = crud_admin.delete_item(db, item_id)
+    result = await crud_admin.delete_item(db, item_id)
     if not result:
         raise HTTPException(status_code=404, detail="Item not found")
     return {"message": "Item deleted successfully"}
 
-@router.get("/users", response_model=List[UserOut])
-def list_users(db: Session = Depends(get_db), admin = Depends(require_admin)):
+@router.get("/db/pool", response_model=Dict[str, Any])
+async def get_pool_metrics(admin = Depends(require_admin)):
+    """Connection pool occupancy and checkout wait times"""
+    return {"async": pool_status(async_engine.sync_engine), "sync": pool_status(engine)}
+
+@router.get("/users", response_model=Union[UserPage, List[UserOut]])
+async def list_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    format: ListingFormat = "json",
+    db: AsyncSession = Depends(get_db),
+    admin = Depends(require_admin),
+):
     """Get all users"""
-    return crud_admin.get_all_users(db)
\ No newline at end of file
+    return await _listing(db, crud_admin.users_query(), User, UserOut, cursor, limit, format, "users")
\ No newline at end of file
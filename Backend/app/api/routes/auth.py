@@ -1,30 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.schemas.user import UserCreate, UserOut
 from app.schemas.auth import Token
-from app.crud.user import get_user_by_email, get_user_by_username_or_email, create_user
-from app.core.security import verify_password, create_access_token
-from app.dependencies.deps import get_db, get_current_user
+from app.crud.user import get_user_by_email, get_user_by_username_or_email, create_user, update_password_hash
+from app.core.security import create_access_token, verify_and_update_password
+from app.dependencies.deps import get_db, get_current_principal
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 @router.post("/register", response_model=UserOut)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    user = get_user_by_email(db, email=user_in.email)
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
+    user = await get_user_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return create_user(db, user_in)
+    return await create_user(db, user_in)
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = get_user_by_username_or_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await get_user_by_username_or_email(db, form_data.username)
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    token = create_access_token({"sub": user.email})
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        await update_password_hash(db, user, new_hash)
+    token = create_access_token({"sub": user.email, "uid": user.id, "adm": user.is_admin})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user = Depends(get_current_user)):
+async def get_me(current_user = Depends(get_current_principal)):
     return current_user
\ No newline at end of file
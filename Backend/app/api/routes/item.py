@@ -1,39 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 
-from app.schemas.item import ItemCreate, ItemOut, ItemUpdate
+from app.schemas.item import ItemCreate, ItemOut, ItemUpdate, ItemPage, ItemSearchFilters, ItemSearchResult, BulkImportResult
 from app.crud import item as crud_item
+from app.core.bulk_import import ImportFormat
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.crud.user import get_user_by_id
+from app.dependencies.admin import require_admin
 from app.dependencies.deps import get_db, get_current_user
 
 router = APIRouter(prefix="/api/items", tags=["items"])
 
+def _decode_listing_cursor(cursor: Optional[str]):
+    """The (date_added, id) pair a newest-first item listing resumes after"""
+    if not cursor:
+        return None
+    try:
+        after = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if after[0] is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
+
 @router.post("/", response_model=ItemOut)
-def create_item(item: ItemCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return crud_item.create_item(db, item, current_user.id)
+async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    return await crud_item.create_item(db, item, current_user.id)
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_items(
+    request: Request,
+    format: Optional[ImportFormat] = None,
+    owner_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    admin = Depends(require_admin),
+):
+    """Create many items from an NDJSON (one item object per line) or CSV (header row) body.
+
+    Admins only, like import_items.py: the items go to `owner_id` (e.g. a partner shop),
+    by default the admin. The format follows `format`, or else the Content-Type
+    (text/csv, otherwise NDJSON). CSV `images` are a JSON array or URLs separated by "|".
+    Invalid rows are skipped and reported by row number; the rest are created together,
+    pending approval.
+    """
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    if owner_id is None:
+        owner_id = admin.id
+    elif await get_user_by_id(db, owner_id) is None:
+        raise HTTPException(status_code=404, detail="Owner not found")
+    try:
+        return await crud_item.bulk_create_items(db, request.stream(), format, owner_id)
+    except crud_item.BulkImportTooLarge:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per import")
+
+@router.get("/", response_model=Union[ItemPage, List[ItemOut]])
+async def list_items(
+    skip: int = 0,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """List approved items.
 
-@router.get("/", response_model=List[ItemOut])
-def list_items(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud_item.get_all_items(db, skip, limit)
+    Without `cursor` this keeps the legacy skip/limit behaviour and returns a plain list.
+    Passing `cursor` (empty for the first page, then the previous `next_cursor`) switches
+    to keyset pagination and returns `{"items": [...], "next_cursor": ...}`.
+    """
+    if cursor is None:
+        return await crud_item.get_all_items(db, skip, limit)
+    after = _decode_listing_cursor(cursor)
+    items, has_more = await crud_item.get_items_page(db, after, limit)
+    next_cursor = encode_cursor(items[-1].date_added, items[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/search", response_model=ItemSearchResult)
+async def search_items(
+    q: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    size: Optional[List[str]] = Query(None),
+    condition: Optional[List[str]] = Query(None),
+    location: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Full-text search and filtering over approved items, with facet counts for the whole result set"""
+    after = _decode_listing_cursor(cursor)
+    filters = ItemSearchFilters(q=q, category=category, size=size, condition=condition, location=location, tags=tags)
+    items, has_more = await crud_item.search_items(db, filters, after, limit)
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1].date_added, items[-1].id) if has_more else None,
+        # Facets only change with the filters, so clients can skip them when paging
+        "facets": await crud_item.get_item_facets(db, filters) if not cursor else {},
+    }
 
 @router.get("/{item_id}", response_model=ItemOut)
-def get_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud_item.get_item(db, item_id)
+async def get_item(item_id: int, db: AsyncSession = Depends(get_db)):
+    db_item = await crud_item.get_item(db, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
+@router.get("/{item_id}/similar", response_model=List[ItemOut])
+async def get_similar_items(item_id: int, k: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    db_item = await crud_item.get_item(db, item_id)
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return await crud_item.get_similar_items(db, db_item, k)
+
 @router.put("/{item_id}", response_model=ItemOut)
-def update_item(item_id: int, updates: ItemUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    db_item = crud_item.get_item(db, item_id)
+async def update_item(item_id: int, updates: ItemUpdate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    db_item = await crud_item.get_item(db, item_id)
     if not db_item or db_item.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this item")
-    return crud_item.update_item(db, item_id, updates)
+    return await crud_item.update_item(db, item_id, updates)
 
 @router.delete("/{item_id}")
-def delete_item(item_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    db_item = crud_item.get_item(db, item_id)
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    db_item = await crud_item.get_item(db, item_id)
     if not db_item or db_item.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this item")
-    crud_item.delete_item(db, item_id)
+    await crud_item.delete_item(db, item_id)
     return {"message": "Item deleted successfully"}
\ No newline at end of file
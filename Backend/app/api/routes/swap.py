@@ -1,40 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.schemas.swap import SwapCreate, SwapOut, SwapUpdate, SwapStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.swap import SwapCreate, SwapDetailOut, SwapOut, SwapUpdate, SwapStatus
 from app.crud import swap as crud_swap
-from app.dependencies.deps import get_db, get_current_user
+from app.dependencies.deps import get_db, get_current_user, get_token_claims
 from typing import List
 
 router = APIRouter(prefix="/api/swaps", tags=["swaps"])
 
 @router.post("/", response_model=SwapOut)
-def create_swap(swap: SwapCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return crud_swap.create_swap(db, swap)
+async def create_swap(swap: SwapCreate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    return await crud_swap.create_swap(db, swap)
 
-@router.get("/", response_model=List[SwapOut])
-def get_user_swaps(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return crud_swap.get_user_swaps(db, current_user.id)
+@router.get("/", response_model=List[SwapDetailOut])
+async def get_user_swaps(db: AsyncSession = Depends(get_db), current_user = Depends(get_token_claims)):
+    swaps = await crud_swap.get_user_swaps(db, current_user.id)
+    return [SwapDetailOut.for_viewer(swap, current_user.id) for swap in swaps]
 
-@router.get("/{swap_id}", response_model=SwapOut)
-def get_swap(swap_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    swap = crud_swap.get_swap_by_id(db, swap_id)
+# Declared before /{swap_id}, which would otherwise capture "history"
+@router.get("/history", response_model=List[SwapDetailOut])
+async def swap_history(db: AsyncSession = Depends(get_db), current_user = Depends(get_token_claims)):
+    swaps = await crud_swap.get_swap_history(db, current_user.id)
+    return [SwapDetailOut.for_viewer(swap, current_user.id) for swap in swaps]
+
+@router.get("/{swap_id}", response_model=SwapDetailOut)
+async def get_swap(swap_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(get_token_claims)):
+    swap = await crud_swap.get_swap_details(db, swap_id)
     if not swap:
         raise HTTPException(status_code=404, detail="Swap not found")
     # Check if user is involved in the swap
     if swap.requester_id != current_user.id and swap.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this swap")
-    return swap
+    return SwapDetailOut.for_viewer(swap, current_user.id)
 
 @router.put("/{swap_id}", response_model=SwapOut)
-def update_swap(swap_id: int, updates: SwapUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    swap = crud_swap.get_swap_by_id(db, swap_id)
+async def update_swap(swap_id: int, updates: SwapUpdate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    swap = await crud_swap.get_swap_by_id(db, swap_id)
     if not swap:
         raise HTTPException(status_code=404, detail="Swap not found")
     # Only owner can accept/reject, requester can cancel
     if swap.owner_id != current_user.id and swap.requester_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this swap")
-    return crud_swap.update_swap(db, swap_id, updates)
-
-@router.get("/history", response_model=List[SwapOut])
-def swap_history(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return crud_swap.get_swap_history(db, current_user.id)
\ No newline at end of file
+    return await crud_swap.update_swap(db, swap_id, updates)
\ No newline at end of file
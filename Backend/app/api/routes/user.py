@@ -1,26 +1,32 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserOut, UserProfileUpdate
 from app.schemas.dashboard import DashboardResponse
-from app.dependencies.deps import get_db, get_current_user
+from app.dependencies.deps import get_db, get_current_user, get_current_principal
 from app.crud.user import update_user_profile
+from app.crud.swap import get_user_swaps
 from app.models.item import Item
+from app.schemas.swap import SwapDetailOut
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.get("/profile", response_model=UserOut)
-def get_profile(current_user = Depends(get_current_user)):
+async def get_profile(current_user = Depends(get_current_principal)):
     return current_user
 
 @router.put("/profile", response_model=UserOut)
-def update_profile(updates: UserProfileUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return update_user_profile(db, current_user, updates)
+async def update_profile(updates: UserProfileUpdate, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    return await update_user_profile(db, current_user, updates)
 
 @router.get("/dashboard", response_model=DashboardResponse)
-def get_dashboard(current_user = Depends(get_current_user), db: Session = Depends(get_db)):
-    user_items = db.query(Item).filter(Item.owner_id == current_user.id).all()
+async def get_dashboard(current_user = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    # Two queries however many items and swaps there are; the user comes from the token cache
+    user_items = (await db.scalars(select(Item).where(Item.owner_id == current_user.id))).all()
+    swaps = await get_user_swaps(db, current_user.id)
     return {
         "email": current_user.email,
         "points": current_user.points,
-        "items": user_items
+        "items": user_items,
+        "swaps": [SwapDetailOut.for_viewer(swap, current_user.id) for swap in swaps],
     }
\ No newline at end of file
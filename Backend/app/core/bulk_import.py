@@ -0,0 +1,102 @@
+"""Streaming parsers for bulk item imports (NDJSON or CSV).
+
+Both turn an async stream of byte chunks, such as a request body or a file being
+read, into (row number, record) pairs one row at a time, so an upload of any size
+is validated and inserted without ever being held in memory as a whole. A row that
+can't be parsed yields an error message in place of the record.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Iterable, Literal, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.schemas.item import ItemCreate
+
+ImportFormat = Literal["ndjson", "csv"]
+
+Record = Union[Dict, str]  # the parsed row, or why it couldn't be parsed
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decoded lines, each ending in its newline except possibly the last"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    row = 0
+    async for line in _lines(chunks):
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, f"Invalid JSON: {e}"
+            continue
+        yield row, record if isinstance(record, dict) else "Expected a JSON object"
+
+def _csv_value(field: str, value: str):
+    if value == "":
+        return None
+    if field == "images":
+        # A JSON array, or URLs separated by "|"
+        if value.lstrip().startswith("["):
+            return json.loads(value)
+        return [url.strip() for url in value.split("|") if url.strip()]
+    return value
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[list]:
+    """Parsed CSV records; a quoted field may span lines, so lines are joined until quotes balance"""
+    record = ""
+    async for line in _lines(chunks):
+        record += line
+        if record.count('"') % 2:
+            continue
+        yield next(csv.reader([record]), [])
+        record = ""
+    if record:
+        yield next(csv.reader([record]), [])
+
+async def csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    """Rows of a CSV file with a header line"""
+    header = None
+    row = 0
+    async for values in _csv_rows(chunks):
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if not any(values):
+            continue
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        try:
+            yield row, {field: _csv_value(field, value) for field, value in zip(header, values)}
+        except json.JSONDecodeError as e:
+            yield row, f"Invalid images: {e}"
+
+def validate(record: Record) -> Union[ItemCreate, str]:
+    if isinstance(record, str):
+        return record
+    try:
+        return ItemCreate.model_validate(record)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors())
+
+def records(chunks: AsyncIterator[bytes], format: ImportFormat) -> AsyncIterator[Tuple[int, Record]]:
+    return (csv_records if format == "csv" else ndjson_records)(chunks)
+
+async def iterate_chunks(chunks: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """Adapt a blocking chunk iterator, e.g. a file read by the CLI"""
+    for chunk in chunks:
+        yield chunk
@@ -5,6 +5,63 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Connection pool, per engine and worker process (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; reconnect before servers/proxies drop idle connections
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Postgres only; 0 disables
+    # SQLite connection pragmas
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes
+    SQLITE_CACHE_SIZE: int = -65536  # negative = KiB, i.e. 64 MiB per connection
+    # Must match the embedding model output (ResNet18 logits in AI_features/image_search)
+    EMBEDDING_DIM: int = 1000
+    # Snapshot location of the NumPy similarity index used when the database has no pgvector
+    SIMILARITY_INDEX_DIR: str = "./similarity_index"
+    # Background jobs (embeddings, ...) are queued in this SQLite file, shared by the workers on the host
+    JOB_QUEUE_PATH: str = "./job_queue.sqlite3"
+    JOB_RETRY_BASE_SECONDS: float = 5.0  # doubles per failed attempt
+    JOB_RETRY_MAX_SECONDS: float = 3600.0
+    # Item embeddings are computed by the image_search service (POST /embed)
+    EMBEDDING_SERVICE_URL: str = "http://localhost:8001"
+    EMBEDDING_SERVICE_TIMEOUT: float = 120.0
+    EMBEDDING_WORKERS: int = 2  # per process; 0 only queues, for replicas that shouldn't run the workers
+    EMBEDDING_BATCH_SIZE: int = 16  # items per request to the service
+    EMBEDDING_IMAGES_PER_ITEM: int = 4  # an item's vector is the mean of its first images
+    # Newly pending items are screened by the clothing detector (SpamDetector/clothes_model_api.py)
+    MODERATION_ENABLED: bool = True  # False leaves every pending item to the admins
+    CLOTHING_DETECTOR_URL: str = "http://localhost:8002"
+    CLOTHING_DETECTOR_TIMEOUT: float = 120.0
+    MODERATION_WORKERS: int = 1  # per process; 0 only queues
+    MODERATION_BATCH_SIZE: int = 32  # items per request to the detector
+    MODERATION_IMAGES_PER_ITEM: int = 4
+    # Detector confidence: approved if every image reaches APPROVE, rejected if none reaches REJECT
+    MODERATION_APPROVE_THRESHOLD: float = 0.9
+    MODERATION_REJECT_THRESHOLD: float = 0.1
+    # After this many attempts where no image could be scored, the item goes to review instead
+    MODERATION_MAX_ATTEMPTS: int = 5
+    # Bulk item imports: rows per INSERT batch, and the most rows one import may contain
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    BULK_IMPORT_MAX_ROWS: int = 100000
+    # Admin stats read the stat_counters table instead of counting rows
+    ADMIN_STATS_FROM_COUNTERS: bool = True
+    # Upper bound on items changed by one bulk moderation request
+    BULK_MODERATION_MAX_ITEMS: int = 10000
+    # Verified tokens are cached this long (capped by the token expiry); 0 disables the cache
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    # Password hashing: raising BCRYPT_ROUNDS rehashes existing passwords on their next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # 0 hashes in this process, on the threadpool (async callers) or the calling thread
+    PASSWORD_HASH_MAX_PENDING: int = 64  # beyond this, login/register answer 503
+    PASSWORD_HASH_NICE: int = 10
+    # Per-route latency and query metrics, served on /metrics in the Prometheus text format
+    METRICS_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 200.0  # statements slower than this are logged with their route; 0 disables
+    # Adds Server-Timing headers (app and database time) to every response; not for production
+    DEBUG: bool = False
     
     # Twilio Settings
     TWILIO_ACCOUNT_SID: str
@@ -0,0 +1,125 @@
+"""Item embeddings computed server-side, off the request path.
+
+Creating an item, or changing its images, queues an "embed" job keyed by the item id.
+Worker tasks send the images of a batch of items to the image_search service in one
+request and store each item's vector: the normalised mean of its first images.
+
+A result is only written if the item still has the images it was computed from, so
+retries and late results are harmless. Items that still lack a vector are queued
+again on startup, which also covers a crash between committing an item and queueing it.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import numpy as np
+from sqlalchemy import select, update
+
+from app.core import similarity
+from app.core.config import settings
+from app.core.job_queue import Job, WorkerPool, get_job_queue
+from app.db.session import AsyncSessionLocal
+from app.models.item import Item, parse_image_urls
+from app.models.stat_counter import bump_vector_changes
+
+EMBED_JOB = "embed"
+
+_pool: Optional[WorkerPool] = None
+_client: Optional[httpx.AsyncClient] = None
+
+def _image_urls(images: Optional[str]) -> List[str]:
+    return parse_image_urls(images)[:settings.EMBEDDING_IMAGES_PER_ITEM]
+
+async def enqueue_items(item_ids: Iterable[int]):
+    """Queue (or re-queue) the embedding of these items"""
+    await asyncio.to_thread(get_job_queue().enqueue_many, EMBED_JOB, [(item_id, None) for item_id in item_ids])
+    if _pool is not None:
+        _pool.notify()
+
+async def enqueue_item(item: Item):
+    if _image_urls(item.images):
+        await enqueue_items([item.id])
+
+async def _fetch_embeddings(urls: List[str]) -> List[Optional[List[float]]]:
+    response = await _client.post(f"{settings.EMBEDDING_SERVICE_URL}/embed", json={"image_urls": urls})
+    response.raise_for_status()
+    return response.json()["embeddings"]
+
+def _item_vector(embeddings: List[Optional[List[float]]]) -> Optional[List[float]]:
+    vectors = [e for e in embeddings if e is not None and len(e) == settings.EMBEDDING_DIM]
+    if not vectors:
+        return None
+    mean = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    norm = np.linalg.norm(mean)
+    return (mean / norm).tolist() if norm else None
+
+async def embed_items(jobs: List[Job]) -> List[Job]:
+    """Job handler: embeds a batch of items in one service call, returns the jobs to retry"""
+    by_item = {int(job.key): job for job in jobs}
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(Item.id, Item.images).where(Item.id.in_(by_item)))).all()
+        images = dict(rows)
+        # Deleted items and items without images have nothing to embed; their jobs just complete
+        urls: Dict[int, List[str]] = {item_id: _image_urls(item_images) for item_id, item_images in rows}
+        urls = {item_id: item_urls for item_id, item_urls in urls.items() if item_urls}
+        if not urls:
+            return []
+
+        embeddings = await _fetch_embeddings([url for item_urls in urls.values() for url in item_urls])
+        if len(embeddings) != sum(map(len, urls.values())):
+            raise ValueError("Embedding service returned a result of the wrong length")
+        vectors, start = {}, 0
+        for item_id, item_urls in urls.items():
+            vectors[item_id] = _item_vector(embeddings[start:start + len(item_urls)])
+            start += len(item_urls)
+
+        written = []
+        for item_id, vector in vectors.items():
+            if vector is None:
+                continue
+            # Skipped if the images changed meanwhile; the edit queued a newer job
+            result = await db.execute(
+                update(Item)
+                .where(Item.id == item_id, Item.images == images[item_id])
+                .values(embeddings=vector)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                written.append(item_id)
+        if written:
+            # The core UPDATE bypasses the mapper events; tell the similarity snapshot
+            await db.run_sync(lambda session: bump_vector_changes(session.connection(), len(written)))
+        await db.commit()
+
+        if written and similarity.is_loaded():
+            for item in (await db.scalars(select(Item).where(Item.id.in_(written)))).all():
+                await similarity.on_item_changed(item)
+    # None of the item's images could be embedded (bad URL, not an image): try again later
+    return [by_item[item_id] for item_id, vector in vectors.items() if vector is None]
+
+async def enqueue_missing():
+    """Queue every item with images but no vector, leaving jobs already queued untouched"""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Item.id, Item.images).where(Item.embeddings.is_(None), Item.images.is_not(None))
+        )).all()
+    missing = [(item_id, None) for item_id, images in rows if _image_urls(images)]
+    await asyncio.to_thread(get_job_queue().enqueue_many, EMBED_JOB, missing, replace=False)
+
+async def start_workers():
+    global _pool, _client
+    await enqueue_missing()
+    if settings.EMBEDDING_WORKERS <= 0:
+        return
+    _client = httpx.AsyncClient(timeout=settings.EMBEDDING_SERVICE_TIMEOUT)
+    _pool = WorkerPool(EMBED_JOB, embed_items, settings.EMBEDDING_WORKERS, settings.EMBEDDING_BATCH_SIZE)
+    _pool.start()
+
+async def stop_workers():
+    global _pool, _client
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,204 @@
+"""Durable background jobs: a queue in a local SQLite file, drained by asyncio worker pools.
+
+A job is identified by (kind, key), e.g. ("embed", "42") for item 42, so enqueueing work
+that is already queued coalesces into one job instead of repeating it. Re-enqueueing
+bumps the job's version: a worker that finishes an older version leaves the newer one
+queued, so an item edited mid-run is processed again with its latest data.
+
+Workers claim jobs under a lease. A worker process that dies mid-batch loses its lease,
+and the jobs become claimable again once it expires. Failed jobs are retried with
+exponential backoff and never dropped, so handlers must be idempotent.
+
+The file is shared by every worker process on the host, and claims are atomic across
+them (BEGIN IMMEDIATE), so each job runs in one place at a time.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Job:
+    kind: str
+    key: str
+    payload: Any
+    attempts: int
+    version: int
+
+class JobQueue:
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (kind TEXT, key TEXT, payload TEXT, attempts INTEGER, "
+            "version INTEGER, run_after REAL, lease_until REAL, last_error TEXT, PRIMARY KEY (kind, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_jobs_kind_run_after ON jobs (kind, run_after)")
+
+    def enqueue(self, kind: str, key, payload: Any = None):
+        self.enqueue_many(kind, [(key, payload)])
+
+    def enqueue_many(self, kind: str, jobs: Iterable, replace: bool = True):
+        """Queue (key, payload) pairs. With replace=False, keys already queued are left as they are"""
+        now = time.time()
+        rows = [(kind, str(key), json.dumps(payload), now) for key, payload in jobs]
+        conflict = (
+            "DO UPDATE SET payload = excluded.payload, version = version + 1, attempts = 0, "
+            "run_after = excluded.run_after, last_error = NULL"
+            if replace else "DO NOTHING"
+        )
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO jobs (kind, key, payload, attempts, version, run_after, lease_until) "
+                f"VALUES (?, ?, ?, 0, 0, ?, 0) ON CONFLICT (kind, key) {conflict}",
+                rows,
+            )
+
+    def claim(self, kind: str, limit: int, lease_seconds: float) -> List[Job]:
+        """Lease up to `limit` due jobs of `kind` to the caller"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT key, payload, attempts, version FROM jobs "
+                    "WHERE kind = ? AND run_after <= ? AND lease_until <= ? ORDER BY run_after LIMIT ?",
+                    (kind, now, now, limit),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE jobs SET lease_until = ? WHERE kind = ? AND key = ?",
+                    [(now + lease_seconds, kind, key) for key, *_ in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return [Job(kind, key, json.loads(payload), attempts, version) for key, payload, attempts, version in rows]
+
+    def complete(self, jobs: Iterable[Job]):
+        """Drop finished jobs, unless they were re-enqueued while running"""
+        keys = [(job.kind, job.key, job.version) for job in jobs]
+        with self._lock:
+            self._db.executemany("DELETE FROM jobs WHERE kind = ? AND key = ? AND version = ?", keys)
+            # What's left was re-enqueued: due now, not when the finished run's lease ends
+            self._db.executemany("UPDATE jobs SET lease_until = 0 WHERE kind = ? AND key = ? AND version != ?", keys)
+
+    def retry(self, jobs: Iterable[Job], error: str):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE jobs SET attempts = attempts + 1, run_after = ?, lease_until = 0, last_error = ? "
+                "WHERE kind = ? AND key = ? AND version = ?",
+                [(now + retry_delay(job.attempts), error[:1000], job.kind, job.key, job.version) for job in jobs],
+            )
+            # A re-enqueued job keeps its fresh schedule but must lose the stale lease
+            self._db.executemany(
+                "UPDATE jobs SET lease_until = 0 WHERE kind = ? AND key = ? AND version != ?",
+                [(job.kind, job.key, job.version) for job in jobs],
+            )
+
+    def release(self, jobs: Iterable[Job]):
+        """Give claimed jobs back without counting an attempt"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE jobs SET lease_until = 0 WHERE kind = ? AND key = ?",
+                [(job.kind, job.key) for job in jobs],
+            )
+
+    def counts(self) -> dict:
+        """Queued jobs per kind, and how many of them have failed at least once"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, COUNT(*), SUM(attempts > 0) FROM jobs GROUP BY kind"
+            ).fetchall()
+        return {kind: {"queued": queued, "retrying": retrying} for kind, queued, retrying in rows}
+
+def retry_delay(attempts: int) -> float:
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** attempts, settings.JOB_RETRY_MAX_SECONDS)
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(settings.JOB_QUEUE_PATH)
+    return _queue
+
+class WorkerPool:
+    """`workers` asyncio tasks that claim batches of one kind of job and hand them to `handler`.
+
+    The handler returns the jobs that failed (retried with backoff); the rest are
+    completed. If it raises, the whole batch is retried.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        handler: Callable[[List[Job]], Awaitable[List[Job]]],
+        workers: int,
+        batch_size: int,
+        lease_seconds: float = 300.0,
+        poll_interval: float = 1.0,
+    ):
+        self.kind = kind
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Skip the poll interval, e.g. right after enqueueing from this process"""
+        self._wake.set()
+
+    async def _run(self):
+        queue = get_job_queue()
+        while True:
+            jobs = await asyncio.to_thread(queue.claim, self.kind, self.batch_size, self.lease_seconds)
+            if not jobs:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                failed = await self.handler(jobs)
+                error = "handler reported failure"
+            except asyncio.CancelledError:
+                # Shutting down: release the batch for the next process instead of waiting out the lease
+                await asyncio.to_thread(queue.release, jobs)
+                raise
+            except Exception as e:
+                logger.exception("%s jobs failed", self.kind)
+                failed, error = jobs, repr(e)
+            failed_keys = {job.key for job in failed}
+            await asyncio.to_thread(queue.complete, [job for job in jobs if job.key not in failed_keys])
+            if failed:
+                await asyncio.to_thread(queue.retry, failed, error)
@@ -0,0 +1,241 @@
+"""Request and database instrumentation, exposed in the Prometheus text format on /metrics.
+
+MetricsMiddleware times every request into a latency histogram per route; the route
+is the path template (/api/items/{item_id}), so ids don't multiply the series. The
+hooks instrument_engine installs time every SQL statement. Statements run while a
+request is handled also count toward that request's queries and database time, and
+those slower than SLOW_QUERY_MS are logged with their route. With DEBUG on, each
+response carries its app and database time in a Server-Timing header, which browser
+dev tools display.
+
+The numbers live in memory, per process. With several uvicorn workers a scrape only
+sees the worker that answered it, so run one worker per port when they matter.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.db.pool import pool_status
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"  # 404s, one series however many paths are probed
+BACKGROUND_ROUTE = "background"  # statements outside a request: workers, startup
+
+Labels = Tuple[str, ...]
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: the count of each bucket (not cumulative), then the sum and the count
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            bucket = bisect.bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                series[bucket] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self):
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, labels, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labels, labels, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(series[-2])}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {series[-1]}"
+
+_registry: List[_Metric] = []
+_engines: Dict[str, Engine] = {}
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the last byte of the response",
+    ["method", "route", "status"], LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["method", "route"], QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Counter(
+    "http_request_db_seconds_total", "Time spent in SQL statements while handling requests", ["method", "route"],
+)
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Execution time of SQL statements", ["engine"], LATENCY_BUCKETS,
+)
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ["engine", "route"],
+)
+
+class RequestStats:
+    """Database work done on behalf of one request"""
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # Set by the router once it matched the request
+        return getattr(self.scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+    def server_timing(self, elapsed: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"app;dur={elapsed * 1000:.1f}"
+        )
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class MetricsMiddleware:
+    """Records latency and database work per route, adding Server-Timing headers when DEBUG is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+                    # The frontend is served from another origin
+                    headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            method, route = scope["method"], stats.route
+            REQUEST_DURATION.observe((method, route, str(status)), time.perf_counter() - started)
+            REQUEST_QUERIES.observe((method, route), stats.queries)
+            REQUEST_DB_SECONDS.inc((method, route), stats.db_seconds)
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _forget_failed(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine: Engine, name: str):
+    """Time every statement run on `engine`, a sync Engine (for asyncio, its sync_engine)"""
+    _engines[name] = engine
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        QUERY_DURATION.observe((name,), elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            route = stats.route if stats is not None else BACKGROUND_ROUTE
+            SLOW_QUERIES.inc((name, route))
+            # Statement only: the parameters can hold emails and password hashes
+            logger.warning("Slow query (%.0f ms, %s engine) in %s: %s", elapsed * 1000, name, route, " ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", after_execute)
+    event.listen(engine, "handle_error", _forget_failed)
+
+def _pool_lines() -> List[str]:
+    gauges = [
+        ("db_pool_size", "gauge", "Connections the pool keeps open", "size"),
+        ("db_pool_checked_out", "gauge", "Connections currently in use", "checked_out"),
+        ("db_pool_overflow", "gauge", "Connections open beyond the pool size", "overflow"),
+        ("db_pool_checkouts_total", "counter", "Connections handed out by the pool", "checkouts"),
+        ("db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a free connection", "timeouts"),
+        ("db_pool_wait_seconds_max", "gauge", "Longest wait for a free connection so far", "wait_ms_max"),
+    ]
+    statuses = {name: pool_status(engine) for name, engine in _engines.items()}
+    lines = []
+    for metric, kind, help, key in gauges:
+        samples = [(name, status[key]) for name, status in statuses.items() if key in status]
+        if not samples:
+            continue
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        for name, value in samples:
+            value = value / 1000 if key == "wait_ms_max" else value
+            lines.append(f"{metric}{_labels(['engine'], [name])} {_number(value)}")
+    return lines
+
+def render() -> str:
+    lines = [line for metric in _registry for line in metric.render()]
+    return "\n".join(lines + _pool_lines()) + "\n"
@@ -0,0 +1,154 @@
+"""Automatic first-pass moderation of pending items.
+
+Every newly pending item, and every pending item whose images change, queues a
+"moderate" job. Worker tasks send the images of a batch of items to the clothing
+detector in one request and record, per item, the confidence of its least
+clothing-like image (`moderation_score`) and a verdict (`moderation_label`):
+
+- every image at least MODERATION_APPROVE_THRESHOLD: clothing, the item is approved
+- no image reaching MODERATION_REJECT_THRESHOLD: not_clothing, the item is rejected
+- anything in between: uncertain, the item stays pending for an admin
+
+The admin review queue holds the uncertain band and the items not labelled yet. An
+unreachable detector counts as an attempt that scored nothing, so after
+MODERATION_MAX_ATTEMPTS the item is labelled uncertain. Results are applied only to
+items that are still pending with the images that were scored, so an admin decision
+or an edit made while the detector was running always wins.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from sqlalchemy import select
+
+from app.core import similarity
+from app.core.config import settings
+from app.core.job_queue import Job, WorkerPool, get_job_queue
+from app.db.session import AsyncSessionLocal
+from app.models.item import Item, ItemStatus, ModerationLabel, parse_image_urls
+
+logger = logging.getLogger(__name__)
+
+MODERATE_JOB = "moderate"
+
+_pool: Optional[WorkerPool] = None
+_client: Optional[httpx.AsyncClient] = None
+
+def _image_urls(images: Optional[str]) -> List[str]:
+    # The detector validates URLs; one it rejects would fail the whole batch
+    urls = [url for url in parse_image_urls(images) if url.startswith(("http://", "https://"))]
+    return urls[:settings.MODERATION_IMAGES_PER_ITEM]
+
+async def enqueue_items(item_ids: Iterable[int]):
+    if not settings.MODERATION_ENABLED:
+        return
+    await asyncio.to_thread(get_job_queue().enqueue_many, MODERATE_JOB, [(item_id, None) for item_id in item_ids])
+    if _pool is not None:
+        _pool.notify()
+
+async def enqueue_item(item: Item):
+    if item.status == ItemStatus.pending:
+        await enqueue_items([item.id])
+
+async def _classify(urls: List[str]) -> List[Optional[float]]:
+    """Detector confidence per URL, None for images it couldn't fetch or decode"""
+    scores: List[Optional[float]] = [None] * len(urls)
+    async with _client.stream(
+        "POST", f"{settings.CLOTHING_DETECTOR_URL}/detect-clothing/batch", json={"image_urls": urls}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.strip():
+                result = json.loads(line)
+                scores[result["index"]] = result.get("confidence")
+    return scores
+
+def verdict(scores: List[float]) -> ModerationLabel:
+    if min(scores) >= settings.MODERATION_APPROVE_THRESHOLD:
+        return ModerationLabel.clothing
+    if max(scores) < settings.MODERATION_REJECT_THRESHOLD:
+        return ModerationLabel.not_clothing
+    return ModerationLabel.uncertain
+
+_STATUS_FOR = {ModerationLabel.clothing: ItemStatus.available, ModerationLabel.not_clothing: ItemStatus.rejected}
+
+async def moderate_items(jobs: List[Job]) -> List[Job]:
+    """Job handler: scores a batch of pending items in one detector call, returns the jobs to retry"""
+    by_item = {int(job.key): job for job in jobs}
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Item.id, Item.images).where(Item.id.in_(by_item), Item.status == ItemStatus.pending)
+        )).all()
+    images = dict(rows)
+    urls: Dict[int, List[str]] = {item_id: _image_urls(item_images) for item_id, item_images in rows}
+
+    batch = [url for item_urls in urls.values() for url in item_urls]
+    try:
+        scores = await _classify(batch) if batch else []
+    except (httpx.HTTPError, ValueError, KeyError, IndexError):
+        # Unreachable, or an answer we can't read: nothing scored, so MODERATION_MAX_ATTEMPTS applies
+        logger.warning("Clothing detector failed for %d items", len(urls), exc_info=True)
+        scores = [None] * len(batch)
+    results, retry, start = {}, [], 0
+    for item_id, item_urls in urls.items():
+        item_scores = [s for s in scores[start:start + len(item_urls)] if s is not None]
+        start += len(item_urls)
+        if item_scores:
+            results[item_id] = (min(item_scores), verdict(item_scores))
+        elif item_urls and by_item[item_id].attempts + 1 < settings.MODERATION_MAX_ATTEMPTS:
+            # Nothing could be scored, maybe the detector is still loading: try again later
+            retry.append(by_item[item_id])
+        else:
+            results[item_id] = (None, ModerationLabel.uncertain)
+
+    decided = []
+    async with AsyncSessionLocal() as db:
+        # Row locks on Postgres, so a concurrent admin decision isn't overwritten
+        items = (await db.scalars(
+            select(Item).where(Item.id.in_(results), Item.status == ItemStatus.pending).with_for_update()
+        )).all()
+        for item in items:
+            if item.images != images[item.id]:
+                continue  # edited meanwhile; the edit queued a newer job
+            item.moderation_score, label = results[item.id]
+            item.moderation_label = label.value
+            if label in _STATUS_FOR:
+                # An ORM update, so the stats counters follow the status change
+                item.status = _STATUS_FOR[label]
+                decided.append(item)
+        await db.commit()
+    for item in decided:
+        await similarity.on_item_changed(item)
+    return retry
+
+async def enqueue_unmoderated():
+    """Queue every pending item the pipeline hasn't looked at, leaving jobs already queued untouched"""
+    async with AsyncSessionLocal() as db:
+        item_ids = (await db.scalars(
+            select(Item.id).where(Item.status == ItemStatus.pending, Item.moderation_label.is_(None))
+        )).all()
+    await asyncio.to_thread(
+        get_job_queue().enqueue_many, MODERATE_JOB, [(item_id, None) for item_id in item_ids], replace=False
+    )
+
+async def start_workers():
+    global _pool, _client
+    if not settings.MODERATION_ENABLED:
+        return
+    await enqueue_unmoderated()
+    if settings.MODERATION_WORKERS <= 0:
+        return
+    _client = httpx.AsyncClient(timeout=settings.CLOTHING_DETECTOR_TIMEOUT)
+    _pool = WorkerPool(MODERATE_JOB, moderate_items, settings.MODERATION_WORKERS, settings.MODERATION_BATCH_SIZE)
+    _pool.start()
+
+async def stop_workers():
+    global _pool, _client
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
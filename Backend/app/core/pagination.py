@@ -0,0 +1,25 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple, Type, Union
+
+SortValue = Union[datetime, float, None]
+
+def encode_cursor(sort_value: SortValue, row_id: int) -> str:
+    """Build an opaque cursor from the last row of a page"""
+    payload = [sort_value.isoformat() if isinstance(sort_value, datetime) else sort_value, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_type: Type = datetime) -> Tuple[SortValue, int]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed.
+
+    `sort_type` is the type of the listing's sort key: datetime (the default) or float.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value) if sort_type is datetime else float(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
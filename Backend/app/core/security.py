@@ -1,18 +1,92 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def get_password_hash(password):
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when PASSWORD_HASH_MAX_PENDING jobs are already waiting"""
+
+# bcrypt is deliberately slow and holds the GIL, so it runs in worker processes; a
+# login burst then queues here instead of stalling the API's threadpool
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(settings.PASSWORD_HASH_MAX_PENDING, 1))
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+def _init_worker():
+    # Lower priority so a login burst yields the CPU to request handling
+    if hasattr(os, "nice"):
+        os.nice(settings.PASSWORD_HASH_NICE)
+
+def shutdown_password_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def _submit(fn, *args) -> Future:
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+async def _run(fn, *args):
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        # Inline hashing still has to stay off the event loop
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.wrap_future(_submit(fn, *args))
+
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain, hashed)
+
+def get_password_hash(password):
+    return _submit(_hash, password).result()
+
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _submit(_verify_and_update, plain, hashed).result()[0]
+
+async def hash_password_async(password: str) -> str:
+    return await _run(_hash, password)
+
+async def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses outdated cost parameters"""
+    return await _run(_verify_and_update, plain, hashed)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
\ No newline at end of file
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -0,0 +1,334 @@
+"""In-process cosine similarity index for deployments without pgvector.
+
+Every available item's embedding lives in one contiguous float32 matrix that is
+memory-mapped from SIMILARITY_INDEX_DIR, so restarts reuse the snapshot instead of
+re-reading the whole items table. Rows are L2-normalised on insert, which turns a
+top-k cosine query into a single matmul plus argpartition. The crud write paths
+keep the matrix current incrementally; the database is only scanned when no
+current snapshot exists.
+
+A snapshot is current when it was saved at a clean shutdown (save()) and the
+database's VECTOR_CHANGES counter hasn't moved since. Any other write to the
+vectors, whether made while the index wasn't loaded, by another process, or lost
+in a crash, moves the counter and forces a rebuild. The index blocks (lock, matmul,
+file I/O), so the async helpers below run it in the threadpool.
+
+The snapshot is owned by a single process, which is how SQLite edge sites run: the
+first to load it holds an exclusive lock on SIMILARITY_INDEX_DIR. Any other process
+(say, a second uvicorn worker) keeps no index of its own, which would drift from the
+owner's, and answers each query with a scan of the items table instead.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.item import Item, ItemStatus
+from app.models.stat_counter import VECTOR_CHANGES, StatCounter
+
+logger = logging.getLogger(__name__)
+
+_VECTORS_FILE = "item_vectors.npy"
+_IDS_FILE = "item_ids.npy"
+_META_FILE = "meta.json"
+_LOCK_FILE = "owner.lock"
+_MIN_CAPACITY = 1024
+_SCAN_BATCH = 1000
+
+class SimilarityIndex:
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.count = 0
+        self.ids: Optional[np.memmap] = None
+        self.vectors: Optional[np.memmap] = None
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, _VECTORS_FILE)
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.directory, _IDS_FILE)
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, _META_FILE)
+
+    def load(self, db: Session):
+        """Open the on-disk snapshot, rebuilding it from the database if it is missing or stale"""
+        with self._lock:
+            if not self._open_snapshot(_database_version(db)):
+                self._rebuild(db)
+            # From here on the files change with every write; until save() the snapshot
+            # is marked unsaved, so a crash leads to a rebuild rather than stale vectors
+            self._write_meta(None)
+
+    def save(self, db: Session):
+        """Flush the snapshot and mark it current; only valid once nothing else writes items"""
+        with self._lock:
+            if self.vectors is None:
+                return
+            self.vectors.flush()
+            self.ids.flush()
+            self._write_meta(_database_version(db))
+
+    def _open_snapshot(self, version: int) -> bool:
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta["dim"] != self.dim or meta.get("version") != version:
+                return False
+            vectors = np.load(self._vectors_path, mmap_mode="r+")
+            ids = np.load(self._ids_path, mmap_mode="r+")
+        except (OSError, ValueError, KeyError):
+            return False
+        self.vectors, self.ids = vectors, ids
+        self.count = meta["count"]
+        self.rows = {int(item_id): row for row, item_id in enumerate(self.ids[:self.count])}
+        return True
+
+    def _rebuild(self, db: Session):
+        os.makedirs(self.directory, exist_ok=True)
+        self.count = 0
+        self.vectors = self.ids = None
+        self.rows = {}
+        self._allocate(_MIN_CAPACITY)
+        query = (
+            db.query(Item.id, Item.embeddings)
+            .filter(Item.status == ItemStatus.available, Item.embeddings.is_not(None))
+            .yield_per(1000)
+        )
+        for item_id, embedding in query:
+            self._upsert(item_id, embedding)
+
+    def _allocate(self, capacity: int):
+        """(Re)create the backing files with room for `capacity` rows, keeping existing rows"""
+        self.vectors = self._grow(self._vectors_path, self.vectors, (capacity, self.dim), np.float32)
+        self.ids = self._grow(self._ids_path, self.ids, (capacity,), np.int64)
+
+    def _grow(self, path, current, shape, dtype):
+        grown = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=dtype, shape=shape)
+        if current is not None and self.count:
+            grown[:self.count] = current[:self.count]
+        grown.flush()
+        del grown
+        os.replace(path + ".tmp", path)
+        return np.load(path, mmap_mode="r+")
+
+    def _write_meta(self, version: Optional[int]):
+        meta = {"dim": self.dim, "count": self.count, "version": version}
+        with open(self._meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(self._meta_path + ".tmp", self._meta_path)
+
+    def _upsert(self, item_id: int, embedding: List[float]) -> bool:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.shape != (self.dim,) or not norm:
+            self._remove(item_id)
+            return False
+        row = self.rows.get(item_id)
+        if row is None:
+            if self.count == len(self.vectors):
+                self._allocate(len(self.vectors) * 2)
+            row = self.count
+            self.count += 1
+            self.rows[item_id] = row
+            self.ids[row] = item_id
+        self.vectors[row] = vector / norm
+        return True
+
+    def _remove(self, item_id: int):
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        # Move the last row into the hole so the live rows stay contiguous
+        last = self.count - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.count = last
+
+    # A change arriving before the index is loaded is skipped: it was committed before
+    # the load's scan of the database started, so the scan picks it up
+
+    def update(self, item_id: int, status: ItemStatus, embedding: Optional[List[float]]):
+        """Reflect a created or edited item: indexed while available with an embedding"""
+        with self._lock:
+            if self.vectors is None:
+                return
+            if status == ItemStatus.available and embedding:
+                self._upsert(item_id, embedding)
+            else:
+                self._remove(item_id)
+
+    def remove(self, item_id: int):
+        with self._lock:
+            if self.vectors is None:
+                return
+            self._remove(item_id)
+
+    def apply_many(self, upserts: dict, removals: List[int]):
+        """Batch form of update/remove; `upserts` maps item id to embedding"""
+        with self._lock:
+            if self.vectors is None:
+                return
+            for item_id in removals:
+                self._remove(item_id)
+            for item_id, embedding in upserts.items():
+                if embedding:
+                    self._upsert(item_id, embedding)
+                else:
+                    self._remove(item_id)
+
+    def query(self, embedding: List[float], k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Top-k (item_id, cosine similarity) pairs, best first"""
+        target = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(target)
+        if target.shape != (self.dim,) or not norm:
+            return []
+        with self._lock:
+            if self.vectors is None or not self.count:
+                return []
+            scores = self.vectors[:self.count] @ (target / norm)
+            if exclude_id is not None and exclude_id in self.rows:
+                scores[self.rows[exclude_id]] = -np.inf
+            ids = self.ids[:self.count].copy()
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+def _database_version(db: Session) -> int:
+    return db.query(StatCounter.value).filter(StatCounter.name == VECTOR_CHANGES).scalar() or 0
+
+def _normalised(embedding: List[float], dim: int) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if vector.shape == (dim,) and norm else None
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[keep], scores[keep]
+    return ids, scores
+
+def scan_query(embedding: List[float], k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Same answer as SimilarityIndex.query, read straight from the database"""
+    target = _normalised(embedding, settings.EMBEDDING_DIM)
+    if target is None:
+        return []
+    best_ids, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            select(Item.id, Item.embeddings)
+            .where(Item.status == ItemStatus.available, Item.embeddings.is_not(None), Item.id != exclude_id)
+            .execution_options(yield_per=_SCAN_BATCH)
+        )
+        for rows in result.partitions():
+            vectors = [(item_id, _normalised(e, settings.EMBEDDING_DIM)) for item_id, e in rows]
+            vectors = [(item_id, v) for item_id, v in vectors if v is not None]
+            if not vectors:
+                continue
+            ids = np.array([item_id for item_id, _ in vectors], dtype=np.int64)
+            scores = np.stack([v for _, v in vectors]) @ target
+            best_ids, best_scores = _top_k(np.concatenate([best_ids, ids]), np.concatenate([best_scores, scores]), k)
+    finally:
+        db.close()
+    order = np.argsort(-best_scores)
+    return [(int(best_ids[i]), float(best_scores[i])) for i in order]
+
+def _claim_directory(directory: str):
+    """An open handle holding the directory's exclusive lock, or None if another process has it"""
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, _LOCK_FILE), "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+_owner_lock = None  # held for the life of the process once it owns the snapshot
+_warned_not_owner = False
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """Process-wide index, loaded on first use; None if another process owns the snapshot.
+
+    Blocking, so async callers run it in a thread.
+    """
+    global _index, _owner_lock, _warned_not_owner
+    with _index_lock:
+        if _index is None:
+            if _owner_lock is None:
+                # Retried on every call, so a worker can take over once the owner exits
+                _owner_lock = _claim_directory(settings.SIMILARITY_INDEX_DIR)
+                if _owner_lock is None:
+                    if not _warned_not_owner:
+                        logger.warning(
+                            "%s is owned by another process; similar items are scanned from the database",
+                            settings.SIMILARITY_INDEX_DIR,
+                        )
+                        _warned_not_owner = True
+                    return None
+            # Published before loading, so changes committed during the load wait for it
+            _index = SimilarityIndex(settings.SIMILARITY_INDEX_DIR, settings.EMBEDDING_DIM)
+            db = SessionLocal()
+            try:
+                _index.load(db)
+            except Exception:
+                _index = None
+                raise
+            finally:
+                db.close()
+    return _index
+
+def save():
+    """Mark the loaded snapshot current; called at shutdown, after the workers stopped"""
+    if _index is None or _index.vectors is None:
+        return
+    db = SessionLocal()
+    try:
+        _index.save(db)
+    finally:
+        db.close()
+
+async def query(embedding: List[float], k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    # The first call loads the index
+    index = await run_in_threadpool(get_similarity_index)
+    if index is None:
+        return await run_in_threadpool(scan_query, embedding, k, exclude_id)
+    return await run_in_threadpool(index.query, embedding, k, exclude_id)
+
+async def on_item_changed(item: Item):
+    if _index is not None:
+        await run_in_threadpool(_index.update, item.id, item.status, item.embeddings)
+
+async def on_item_deleted(item_id: int):
+    if _index is not None:
+        await run_in_threadpool(_index.remove, item_id)
+
+def is_loaded() -> bool:
+    return _index is not None
+
+async def on_items_bulk_changed(available: dict, unavailable: List[int]):
+    """Bulk status change: `available` maps newly available ids to their embeddings"""
+    if _index is not None:
+        await run_in_threadpool(_index.apply_many, available, unavailable)
@@ -0,0 +1,74 @@
+"""Streamed listings: rows go from a server-side cursor to the client one batch at a time.
+
+Each stream opens its own session, because the response body is produced after the
+request's dependencies (and their session) may already have been torn down.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from app.db.session import AsyncSessionLocal
+
+STREAM_BATCH_SIZE = 500
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+async def stream_rows(query: Select, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator:
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for row in rows:
+            yield row
+            # Rows already sent don't need to stay in the session
+            db.expunge(row)
+
+def _dump(row, schema: Type[BaseModel]) -> dict:
+    return schema.model_validate(row, from_attributes=True).model_dump(mode="json")
+
+async def _json_array(rows: AsyncIterator, schema: Type[BaseModel]) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+    async for row in rows:
+        yield (b"" if first else b",") + json.dumps(_dump(row, schema)).encode()
+        first = False
+    yield b"]"
+
+async def _ndjson(rows: AsyncIterator, schema: Type[BaseModel]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield json.dumps(_dump(row, schema)).encode() + b"\n"
+
+def _csv_line(values) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode()
+
+async def _csv(rows: AsyncIterator, schema: Type[BaseModel]) -> AsyncIterator[bytes]:
+    fields = list(schema.model_fields)
+    yield _csv_line(fields)
+    async for row in rows:
+        data = _dump(row, schema)
+        yield _csv_line(
+            "" if data[f] is None else json.dumps(data[f]) if isinstance(data[f], (list, dict)) else data[f]
+            for f in fields
+        )
+
+_ENCODERS = {"json": _json_array, "ndjson": _ndjson, "csv": _csv}
+
+def streaming_listing(query: Select, schema: Type[BaseModel], format: str = "json", filename: str = "export") -> StreamingResponse:
+    """Stream every row of `query` serialised through `schema`, as a JSON array, NDJSON or CSV"""
+    headers = {}
+    if format != "json":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{format}"'
+    return StreamingResponse(
+        _ENCODERS[format](stream_rows(query), schema),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
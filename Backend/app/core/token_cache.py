@@ -0,0 +1,102 @@
+"""Bounded TTL cache of verified access tokens.
+
+Maps a bearer token to the UserPrincipal it resolved to, so repeat requests with the
+same token skip both JWT verification and the user lookup. An entry lives for at most
+TOKEN_CACHE_TTL_SECONDS and never past the token's own expiry.
+
+Entries are dropped whenever a commit touches their user: any flushed change to a
+User row (profile edits, admin changes, points from swaps) invalidates every token
+of that user once the transaction commits, so the next request reloads fresh data.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.auth import UserPrincipal
+
+class TokenCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[UserPrincipal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._discard(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: UserPrincipal, token_exp: Optional[float] = None):
+        """Cache a principal; `token_exp` is the token's `exp` claim (unix time)"""
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (principal, time.monotonic() + lifetime)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._discard(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[0].id
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
+_CHANGED_USERS = "token_cache_changed_users"
+
+def mark_users_changed(session, user_ids):
+    """Invalidate these users' tokens on commit, for bulk UPDATEs that bypass the flush"""
+    session.info.setdefault(_CHANGED_USERS, set()).update(user_ids)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault(_CHANGED_USERS, set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    # Only after commit, so a concurrent request can't re-cache the pre-commit row
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        token_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
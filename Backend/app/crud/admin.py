@@ -1,50 +1,171 @@
-from sqlalchemy.orm import Session
-from app.models.item import Item, ItemStatus
+from collections import Counter
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.item import Item, ItemStatus, ModerationLabel
 from app.models.user import User
-from typing import Dict, Any
+from app.models.stat_counter import StatCounter, ITEMS, USERS, ADMIN_USERS, STATS_COUNTERS, bump_counter, bump_vector_changes, item_status_counter
+from app.schemas.item import BulkItemFilter
+from app.core import similarity
+from typing import Dict, Any, List, Optional, Tuple
 
-def get_pending_items(db: Session):
-    return db.query(Item).filter(Item.status == ItemStatus.pending).all()
+def items_query(status: Optional[ItemStatus] = None):
+    """Admin item listing, optionally restricted to one status, in id order"""
+    query = select(Item).order_by(Item.id)
+    if status is not None:
+        query = query.where(Item.status == status)
+    return query
 
-def get_all_items(db: Session):
-    return db.query(Item).all()
+# Items the detector couldn't score, or hasn't yet, sort ahead of every scored one
+UNSCORED = -1.0
+_review_score = func.coalesce(Item.moderation_score, UNSCORED)
 
-def get_items_by_status(db: Session, status: ItemStatus):
-    return db.query(Item).filter(Item.status == status).all()
+def review_queue_query():
+    """Pending items the moderation pipeline left to an admin, least clothing-like first.
 
-def update_item_status(db: Session, item_id: int, new_status: ItemStatus):
-    item = db.query(Item).filter(Item.id == item_id).first()
+    Items it hasn't labelled yet are included too: they may be queued behind an
+    unreachable detector, so hiding them could hide them for good.
+    """
+    return (
+        select(Item)
+        .where(
+            Item.status == ItemStatus.pending,
+            or_(Item.moderation_label.is_(None), Item.moderation_label == ModerationLabel.uncertain.value),
+        )
+        .order_by(_review_score, Item.id)
+    )
+
+def review_sort_value(item: Item) -> float:
+    return UNSCORED if item.moderation_score is None else item.moderation_score
+
+async def get_review_page(db: AsyncSession, after: Optional[Tuple[float, int]], limit: int):
+    """Keyset page of the review queue, starting after the (score, id) pair"""
+    query = review_queue_query()
+    if after:
+        after_score, after_id = after
+        query = query.where(or_(
+            _review_score > after_score,
+            and_(_review_score == after_score, Item.id > after_id),
+        ))
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    return rows[:limit], len(rows) > limit
+
+def users_query():
+    return select(User).order_by(User.id)
+
+async def get_page(db: AsyncSession, query, model, after_id: Optional[int], limit: int):
+    """Keyset page of an id-ordered listing query: rows after `after_id`, and whether more exist"""
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    return rows[:limit], len(rows) > limit
+
+async def update_item_status(db: AsyncSession, item_id: int, new_status: ItemStatus):
+    item = await db.get(Item, item_id)
     if not item:
         return None
     item.status = new_status
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
+    await similarity.on_item_changed(item)
     return item
 
-def delete_item(db: Session, item_id: int):
-    item = db.query(Item).filter(Item.id == item_id).first()
+async def bulk_update_item_status(
+    db: AsyncSession,
+    new_status: ItemStatus,
+    item_ids: Optional[List[int]] = None,
+    filter: Optional[BulkItemFilter] = None,
+) -> Dict[str, Any]:
+    """Move many items to `new_status` with a single UPDATE in one transaction"""
+    max_items = settings.BULK_MODERATION_MAX_ITEMS
+    query = select(Item.id, Item.status)
+    if item_ids is not None:
+        query = query.where(Item.id.in_(item_ids))
+    else:
+        if filter.status is not None:
+            query = query.where(Item.status == filter.status)
+        if filter.category is not None:
+            query = query.where(Item.category == filter.category)
+        if filter.owner_id is not None:
+            query = query.where(Item.owner_id == filter.owner_id)
+        # Items already in the target status are skipped, so repeating a truncated request
+        # reaches the rest instead of matching the same first batch again
+        query = query.where(Item.status != new_status).order_by(Item.id).limit(max_items + 1)
+    # Row locks on Postgres, so the old statuses used for the counters stay accurate
+    current = dict((await db.execute(query.with_for_update())).all())
+    truncated = len(current) > max_items
+    if truncated:
+        current = dict(list(current.items())[:max_items])
+
+    to_change = [item_id for item_id, status in current.items() if status != new_status]
+    if to_change:
+        await db.execute(
+            update(Item).where(Item.id.in_(to_change)).values(status=new_status),
+            execution_options={"synchronize_session": False},
+        )
+        # The bulk UPDATE bypasses the mapper events that keep the stats counters current
+        moved = Counter(current[item_id] for item_id in to_change)
+        def adjust_counters(session):
+            connection = session.connection()
+            for old_status, count in moved.items():
+                bump_counter(connection, item_status_counter(old_status), -count)
+            bump_counter(connection, item_status_counter(new_status), len(to_change))
+            bump_vector_changes(connection)
+        await db.run_sync(adjust_counters)
+    await db.commit()
+
+    if to_change and similarity.is_loaded():
+        if new_status == ItemStatus.available:
+            rows = await db.execute(select(Item.id, Item.embeddings).where(Item.id.in_(to_change)))
+            await similarity.on_items_bulk_changed(dict(rows.all()), [])
+        else:
+            await similarity.on_items_bulk_changed({}, to_change)
+
+    changed = set(to_change)
+    results = {item_id: "updated" if item_id in changed else "unchanged" for item_id in current}
+    for item_id in item_ids or []:
+        results.setdefault(item_id, "not_found")
+    return {"status": new_status, "updated": len(to_change), "results": results, "truncated": truncated}
+
+async def delete_item(db: AsyncSession, item_id: int):
+    item = await db.get(Item, item_id)
     if not item:
         return None
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
+    await similarity.on_item_deleted(item_id)
     return True
 
-def get_all_users(db: Session):
-    return db.query(User).all()
-
-def get_admin_stats(db: Session) -> Dict[str, Any]:
-    total_items = db.query(Item).count()
-    pending_items = db.query(Item).filter(Item.status == ItemStatus.pending).count()
-    approved_items = db.query(Item).filter(Item.status == ItemStatus.available).count()
-    rejected_items = db.query(Item).filter(Item.status == ItemStatus.rejected).count()
-    total_users = db.query(User).count()
-    admin_users = db.query(User).filter(User.is_admin == True).count()
-    
-    return {
-        "total_items": total_items,
-        "pending_items": pending_items,
-        "approved_items": approved_items,
-        "rejected_items": rejected_items,
-        "total_users": total_users,
-        "admin_users": admin_users
-    }
\ No newline at end of file
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+async def _aggregate_admin_stats(db: AsyncSession) -> Dict[str, Any]:
+    """All stats in one statement: a single pass over items and one over users"""
+    items = select(
+        func.count().label("total_items"),
+        _count_where(Item.status == ItemStatus.pending).label("pending_items"),
+        _count_where(Item.status == ItemStatus.available).label("approved_items"),
+        _count_where(Item.status == ItemStatus.rejected).label("rejected_items"),
+    ).select_from(Item).subquery()
+    users = select(
+        func.count().label("total_users"),
+        _count_where(User.is_admin == True).label("admin_users"),
+    ).select_from(User).subquery()
+    row = (await db.execute(select(items, users))).one()
+    return dict(row._mapping)
+
+async def get_admin_stats(db: AsyncSession) -> Dict[str, Any]:
+    if settings.ADMIN_STATS_FROM_COUNTERS:
+        counters = dict((await db.execute(select(StatCounter.name, StatCounter.value))).all())
+        # A missing counter means the table was never seeded and the others can't be
+        # trusted either (see migration e6c3f2a18b90); fall back to counting
+        if all(name in counters for name in STATS_COUNTERS):
+            return {
+                "total_items": counters[ITEMS],
+                "pending_items": counters[item_status_counter(ItemStatus.pending)],
+                "approved_items": counters[item_status_counter(ItemStatus.available)],
+                "rejected_items": counters[item_status_counter(ItemStatus.rejected)],
+                "total_users": counters[USERS],
+                "admin_users": counters[ADMIN_USERS],
+            }
+    return await _aggregate_admin_stats(db)
\ No newline at end of file
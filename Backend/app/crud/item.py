@@ -1,9 +1,23 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, or_, func, insert, select, literal, literal_column, table, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.item import Item, ItemStatus
-from app.schemas.item import ItemCreate, ItemUpdate
+from app.models.stat_counter import ITEMS, bump_counter, item_status_counter
+from app.schemas.item import ItemCreate, ItemUpdate, ItemSearchFilters
+from app.core import embeddings, moderation, similarity
+from app.core.bulk_import import ImportFormat, records, validate
+from app.core.config import settings
+from typing import AsyncIterator
+import asyncio
 import json
+import tempfile
 
-def create_item(db: Session, item: ItemCreate, owner_id: int):
+MAX_REPORTED_ERRORS = 1000
+SPOOL_MEMORY_BYTES = 4 * 1024 * 1024  # validated rows beyond this go to a temporary file
+
+class BulkImportTooLarge(Exception):
+    """The upload has more rows than BULK_IMPORT_MAX_ROWS; nothing was imported"""
+
+async def create_item(db: AsyncSession, item: ItemCreate, owner_id: int):
     item_data = item.dict()
     # Convert images list to JSON string for database storage
     if item_data.get('images') and isinstance(item_data['images'], list):
@@ -17,19 +31,204 @@ def create_item(db: Session, item: ItemCreate, owner_id: int):
     
     db_item = Item(**item_data, owner_id=owner_id)
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    await similarity.on_item_changed(db_item)
+    # Computed in the background; the listing doesn't wait for the models
+    await embeddings.enqueue_item(db_item)
+    await moderation.enqueue_item(db_item)
     return db_item
 
-def get_item(db: Session, item_id: int):
-    return db.query(Item).filter(Item.id == item_id).first()
+def _import_row(item: ItemCreate) -> dict:
+    # Same column values as create_item; every row carries every key so they batch together
+    row = item.dict()
+    row['images'] = json.dumps(row['images'] or [])
+    if row['points'] is None:
+        row['points'] = 0
+    return row
+
+async def _spool_valid_rows(chunks: AsyncIterator[bytes], format: ImportFormat):
+    """Read and validate a whole upload before the database is touched.
+
+    The valid rows are written to a temporary file, one JSON object per line (kept in
+    memory up to SPOOL_MEMORY_BYTES), so a slow or huge upload never holds a
+    transaction open. Returns the file, rewound, and the rejected rows.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    errors, failed, seen = [], 0, 0
+    lines = []
+    try:
+        async for row, record in records(chunks, format):
+            seen += 1
+            if seen > settings.BULK_IMPORT_MAX_ROWS:
+                raise BulkImportTooLarge()
+            item = validate(record)
+            if isinstance(item, str):
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": row, "error": item})
+                continue
+            lines.append(json.dumps(_import_row(item)).encode() + b"\n")
+            if len(lines) >= settings.BULK_IMPORT_CHUNK_SIZE:
+                await asyncio.to_thread(spool.writelines, lines)
+                lines = []
+        await asyncio.to_thread(spool.writelines, lines)
+        await asyncio.to_thread(spool.seek, 0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool, errors, failed
+
+def _read_batches(spool):
+    batch = []
+    for line in spool:
+        batch.append(json.loads(line))
+        if len(batch) >= settings.BULK_IMPORT_CHUNK_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def bulk_create_items(db: AsyncSession, chunks: AsyncIterator[bytes], format: ImportFormat, owner_id: int):
+    """Import items from an NDJSON/CSV byte stream in one transaction.
+
+    The upload is read and validated to the end first; only then is the transaction
+    opened, and the valid rows inserted BULK_IMPORT_CHUNK_SIZE at a time with multi-row
+    INSERTs. Invalid rows are skipped and reported; the valid ones are committed
+    together, then queued for embedding and moderation like single creates.
+    """
+    if db.in_transaction():
+        # e.g. the caller's user lookup: give the connection back while the upload streams in
+        await db.commit()
+    spool, errors, failed = await _spool_valid_rows(chunks, format)
+    item_ids = []
+    try:
+        batches = _read_batches(spool)
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            rows = [{**row, 'status': ItemStatus.pending, 'owner_id': owner_id} for row in batch]
+            result = await db.execute(insert(Item).returning(Item.id, sort_by_parameter_order=True), rows)
+            item_ids.extend(result.scalars().all())
+
+        if item_ids:
+            # Multi-row INSERTs skip the mapper events that keep the stats counters current
+            def adjust_counters(session):
+                connection = session.connection()
+                bump_counter(connection, ITEMS, len(item_ids))
+                bump_counter(connection, item_status_counter(ItemStatus.pending), len(item_ids))
+            await db.run_sync(adjust_counters)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        spool.close()
+
+    await embeddings.enqueue_items(item_ids)
+    await moderation.enqueue_items(item_ids)
+    return {"created": len(item_ids), "failed": failed, "item_ids": item_ids, "errors": errors}
+
+async def get_item(db: AsyncSession, item_id: int):
+    return await db.get(Item, item_id)
 
-def get_all_items(db: Session, skip=0, limit=10):
+async def get_all_items(db: AsyncSession, skip=0, limit=10):
     # Only return approved items for regular users
-    return db.query(Item).filter(Item.status == ItemStatus.available).offset(skip).limit(limit).all()
+    query = select(Item).where(Item.status == ItemStatus.available).offset(skip).limit(limit)
+    return (await db.scalars(query)).all()
+
+async def _keyset_page(db: AsyncSession, query, after: tuple | None, limit: int):
+    """Newest-first keyset page of an Item select, starting after the (date_added, id) pair"""
+    if after:
+        # A row-value comparison, so the index seeks straight to the cursor
+        query = query.where(tuple_(Item.date_added, Item.id) < after)
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(Item.date_added.desc(), Item.id.desc()).limit(limit + 1)
+    rows = (await db.scalars(query)).all()
+    return rows[:limit], len(rows) > limit
+
+async def get_items_page(db: AsyncSession, after: tuple | None = None, limit=10):
+    query = select(Item).where(Item.status == ItemStatus.available)
+    return await _keyset_page(db, query, after, limit)
+
+def _fts5_query(text: str) -> str:
+    # Quote every term so user input can't inject FTS5 syntax; the trailing * gives prefix matching
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _postgres_search_document():
+    # Must match POSTGRES_SEARCH_DOCUMENT (ix_items_search_tsv) exactly for the GIN index to be used
+    return func.to_tsvector(
+        literal_column("'english'"),
+        func.coalesce(Item.title, "") + " " + func.coalesce(Item.description, "") + " " + func.coalesce(Item.tags, ""),
+    )
+
+def _text_match(db: AsyncSession, q: str):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        fts_ids = select(literal_column("rowid")).select_from(table("items_fts")).where(
+            literal_column("items_fts").op("MATCH")(_fts5_query(q))
+        )
+        return Item.id.in_(fts_ids)
+    if dialect == "postgresql":
+        return _postgres_search_document().op("@@")(func.plainto_tsquery(literal_column("'english'"), q))
+    pattern = f"%{q}%"
+    return or_(Item.title.ilike(pattern), Item.description.ilike(pattern), Item.tags.ilike(pattern))
+
+def _search_conditions(db: AsyncSession, filters: ItemSearchFilters):
+    conditions = [Item.status == ItemStatus.available]
+    if filters.q and filters.q.strip():
+        conditions.append(_text_match(db, filters.q))
+    if filters.category:
+        conditions.append(Item.category.in_(filters.category))
+    if filters.size:
+        conditions.append(Item.size.in_(filters.size))
+    if filters.condition:
+        conditions.append(Item.condition.in_(filters.condition))
+    if filters.location:
+        conditions.append(Item.location.ilike(f"%{filters.location}%"))
+    for tag in filters.tags or []:
+        conditions.append(Item.tags.ilike(f"%{tag}%"))
+    return conditions
+
+async def search_items(db: AsyncSession, filters: ItemSearchFilters, after: tuple | None = None, limit=10):
+    query = select(Item).where(*_search_conditions(db, filters))
+    return await _keyset_page(db, query, after, limit)
+
+async def get_item_facets(db: AsyncSession, filters: ItemSearchFilters):
+    """Counts per category/size/condition over the filtered items, computed in a single query"""
+    conditions = _search_conditions(db, filters)
+    facet_queries = [
+        select(literal(name).label("facet"), column.label("value"), func.count().label("count"))
+        .where(*conditions, column.is_not(None))
+        .group_by(column)
+        for name, column in (("category", Item.category), ("size", Item.size), ("condition", Item.condition))
+    ]
+    facets = {"category": {}, "size": {}, "condition": {}}
+    for facet, value, count in await db.execute(union_all(*facet_queries)):
+        facets[facet][value] = count
+    return facets
+
+async def get_similar_items(db: AsyncSession, item: Item, k=10):
+    """k nearest approved items by cosine distance"""
+    if not item.embeddings:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        # <=> is pgvector's cosine distance operator, served by the HNSW index
+        distance = Item.embeddings.op("<=>", return_type=Float)(item.embeddings)
+        query = (
+            select(Item)
+            .where(Item.status == ItemStatus.available, Item.id != item.id, Item.embeddings.is_not(None))
+            .order_by(distance)
+            .limit(k)
+        )
+        return (await db.scalars(query)).all()
+    # Without pgvector, rank against the in-process NumPy index and fetch only the winners
+    neighbours = await similarity.query(item.embeddings, k, exclude_id=item.id)
+    ranked_ids = [item_id for item_id, _ in neighbours]
+    items = {i.id: i for i in (await db.scalars(select(Item).where(Item.id.in_(ranked_ids)))).all()}
+    return [items[item_id] for item_id in ranked_ids if item_id in items]
 
-def update_item(db: Session, item_id: int, updates: ItemUpdate):
-    db_item = get_item(db, item_id)
+async def update_item(db: AsyncSession, item_id: int, updates: ItemUpdate):
+    db_item = await get_item(db, item_id)
     if not db_item:
         return None
     
@@ -37,17 +236,24 @@ def update_item(db: Session, item_id: int, updates: ItemUpdate):
     # Convert images list to JSON string for database storage
     if 'images' in update_data and isinstance(update_data['images'], list):
         update_data['images'] = json.dumps(update_data['images'])
+    images_changed = 'images' in update_data and update_data['images'] != db_item.images
     
     for field, value in update_data.items():
         setattr(db_item, field, value)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    await similarity.on_item_changed(db_item)
+    # The old vector keeps the item searchable until the new one is written
+    if images_changed:
+        await embeddings.enqueue_item(db_item)
+        await moderation.enqueue_item(db_item)
     return db_item
 
-def delete_item(db: Session, item_id: int):
-    db_item = get_item(db, item_id)
+async def delete_item(db: AsyncSession, item_id: int):
+    db_item = await get_item(db, item_id)
     if db_item:
-        db.delete(db_item)
-        db.commit()
+        await db.delete(db_item)
+        await db.commit()
+        await similarity.on_item_deleted(item_id)
         return True
     return False
\ No newline at end of file
@@ -1,10 +1,21 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, union, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from app.models.swap import Swap, SwapStatus
 from app.schemas.swap import SwapCreate, SwapUpdate
-from app.crud.user import update_user_stats_on_swap_completion
+from app.crud.user import add_swap_completion_stats
 from app.models.item import Item
+from app.models.user import User
 
-def create_swap(db: Session, swap_data: SwapCreate):
+def _with_details(query):
+    """Load each swap's item and both users in the same SELECT, only the columns SwapDetailOut shows"""
+    return query.options(
+        joinedload(Swap.item).load_only(Item.id, Item.title, Item.images),
+        joinedload(Swap.requester).load_only(User.id, User.name, User.avatar),
+        joinedload(Swap.owner).load_only(User.id, User.name, User.avatar),
+    )
+
+async def create_swap(db: AsyncSession, swap_data: SwapCreate):
     swap = Swap(
         item_id=swap_data.item_id,
         requester_id=swap_data.requester_id,
@@ -12,45 +23,60 @@ def create_swap(db: Session, swap_data: SwapCreate):
         message=swap_data.message
     )
     db.add(swap)
-    db.commit()
-    db.refresh(swap)
+    await db.commit()
+    await db.refresh(swap)
     return swap
 
-def get_user_swaps(db: Session, user_id: int):
-    return db.query(Swap).filter(
-        (Swap.requester_id == user_id) | (Swap.owner_id == user_id)
-    ).all()
+def _user_swap_ids(user_id: int, *conditions):
+    """Ids of the user's swaps on either side. A UNION instead of an OR, so each half is a
+    range scan of its (requester_id/owner_id, status) index"""
+    return union(
+        select(Swap.id).where(Swap.requester_id == user_id, *conditions),
+        select(Swap.id).where(Swap.owner_id == user_id, *conditions),
+    )
+
+async def get_user_swaps(db: AsyncSession, user_id: int):
+    query = _with_details(select(Swap)).where(Swap.id.in_(_user_swap_ids(user_id)))
+    return (await db.scalars(query)).all()
+
+async def get_swap_by_id(db: AsyncSession, swap_id: int):
+    return await db.get(Swap, swap_id)
+
+async def get_swap_details(db: AsyncSession, swap_id: int):
+    return await db.scalar(_with_details(select(Swap)).where(Swap.id == swap_id))
+
+async def update_swap(db: AsyncSession, swap_id: int, updates: SwapUpdate):
+    """Apply `updates` in one transaction. Accepting a pending swap credits both users.
 
-def get_swap_by_id(db: Session, swap_id: int):
-    return db.query(Swap).filter(Swap.id == swap_id).first()
+    The pending -> accepted transition is a conditional UPDATE, which row-locks the swap
+    and matches only if it is still pending. Of two concurrent accepts exactly one wins
+    and awards the points; the other finds the swap already accepted.
+    """
+    values = updates.dict(exclude_unset=True)
+    if values.get("status") == SwapStatus.accepted:
+        accepted = (await db.execute(
+            update(Swap)
+            .where(Swap.id == swap_id, Swap.status == SwapStatus.pending)
+            .values(**values)
+            .returning(Swap.item_id, Swap.owner_id, Swap.requester_id)
+        )).first()
+        if accepted:
+            # Item points are read inside the same UPDATE; default points if the item is gone
+            points_earned = func.coalesce(
+                select(Item.points).where(Item.id == accepted.item_id).scalar_subquery(), 25
+            )
+            await add_swap_completion_stats(db, (accepted.owner_id, accepted.requester_id), points_earned)
+            values = {}
 
-def update_swap(db: Session, swap_id: int, updates: SwapUpdate):
-    swap = get_swap_by_id(db, swap_id)
+    swap = await get_swap_by_id(db, swap_id)
     if not swap:
+        await db.rollback()
         return None
-    
-    # Store the old status to check if we're accepting a swap
-    old_status = swap.status
-    
-    for field, value in updates.dict(exclude_unset=True).items():
+    for field, value in values.items():
         setattr(swap, field, value)
-    
-    # If swap is being accepted, update user stats
-    if old_status == SwapStatus.pending and swap.status == SwapStatus.accepted:
-        # Get the item to determine points
-        item = db.query(Item).filter(Item.id == swap.item_id).first()
-        points_earned = item.points if item else 25  # Default points if item not found
-        
-        # Update stats for both users
-        update_user_stats_on_swap_completion(db, swap.owner_id, points_earned)
-        update_user_stats_on_swap_completion(db, swap.requester_id, points_earned)
-    
-    db.commit()
-    db.refresh(swap)
+    await db.commit()
     return swap
 
-def get_swap_history(db: Session, user_id: int):
-    return db.query(Swap).filter(
-        (Swap.requester_id == user_id) | (Swap.owner_id == user_id),
-        Swap.status != SwapStatus.pending
-    ).all()
\ No newline at end of file
+async def get_swap_history(db: AsyncSession, user_id: int):
+    ids = _user_swap_ids(user_id, Swap.status != SwapStatus.pending)
+    return (await db.scalars(_with_details(select(Swap)).where(Swap.id.in_(ids)))).all()
\ No newline at end of file
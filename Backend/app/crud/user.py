@@ -1,62 +1,78 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.schemas.user import UserCreate, UserProfileUpdate
-from app.core.security import get_password_hash
+from app.core.security import hash_password_async
+from app.core.token_cache import mark_users_changed
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
 
-def get_user_by_username_or_email(db: Session, username: str):
+async def get_user_by_username_or_email(db: AsyncSession, username: str):
     """Get user by username or email - handles both cases"""
     # First try to find by email
-    user = db.query(User).filter(User.email == username).first()
+    user = await get_user_by_email(db, username)
     if user:
         return user
-    
+
     # Special case for admin username
     if username == "admin":
-        return db.query(User).filter(User.email == "admin@admin.com").first()
-    
+        return await get_user_by_email(db, "admin@admin.com")
+
     return None
 
-def create_user(db: Session, user: UserCreate):
+async def create_user(db: AsyncSession, user: UserCreate):
     db_user = User(
-        email=user.email, 
-        hashed_password=get_password_hash(user.password),
+        email=user.email,
+        hashed_password=await hash_password_async(user.password),
         name=user.name,
         avatar=user.avatar,
         location=user.location
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user_profile(db: Session, db_user: User, updates: UserProfileUpdate):
+async def update_user_profile(db: AsyncSession, db_user: User, updates: UserProfileUpdate):
     if updates.email:
         db_user.email = updates.email
     if updates.password:
-        db_user.hashed_password = get_password_hash(updates.password)
+        db_user.hashed_password = await hash_password_async(updates.password)
     if updates.name:
         db_user.name = updates.name
     if updates.avatar:
         db_user.avatar = updates.avatar
     if updates.location:
         db_user.location = updates.location
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user_stats_on_swap_completion(db: Session, user_id: int, points_earned: int):
-    """Update user stats when a swap is completed"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.swaps_completed += 1
-        user.points += points_earned
-        user.impact_score += 10  # Fixed impact score per swap
-        db.commit()
-        db.refresh(user)
-    return user
-
-def get_user_by_id(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
\ No newline at end of file
+async def update_password_hash(db: AsyncSession, db_user: User, hashed_password: str):
+    """Store a rehashed password, e.g. after the bcrypt cost changed"""
+    db_user.hashed_password = hashed_password
+    await db.commit()
+    return db_user
+
+async def add_swap_completion_stats(db: AsyncSession, user_ids, points_earned):
+    """Credit a completed swap to its users, without committing.
+
+    A single UPDATE that increments in the database, so concurrent swaps of the same user
+    can't overwrite each other's points. `points_earned` may be an int or a SQL expression.
+    """
+    user_ids = list(user_ids)
+    await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(
+            swaps_completed=User.swaps_completed + 1,
+            points=User.points + points_earned,
+            impact_score=User.impact_score + 10,  # Fixed impact score per swap
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+    mark_users_changed(db, user_ids)
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.get(User, user_id)
@@ -1,6 +1,63 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from app.core import metrics
 from app.core.config import settings
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from app.db.url import async_database_url, sync_database_url
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+def _engine_options(url: URL, pool_class) -> dict:
+    if _is_memory_sqlite(url):
+        # A single shared connection; there is nothing to size
+        return {}
+    options = {
+        "poolclass": pool_class,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer commits; NORMAL is durable across app crashes in WAL mode
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+def _configure(sync_engine, name: str):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(sync_engine, name)
+    return sync_engine
+
+_sync_url = sync_database_url(settings.DATABASE_URL)
+_async_url = async_database_url(settings.DATABASE_URL)
+
+# Blocking engine for Alembic, scripts and work done in background threads
+engine = _configure(create_engine(_sync_url, **_engine_options(_sync_url, TimedQueuePool)), "sync")
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Request handlers share the asyncio engine, so waiting on the database doesn't hold a thread
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url, TimedAsyncAdaptedQueuePool))
+_configure(async_engine.sync_engine, "async")
+# Rows stay loaded after commit: attribute access can't lazily re-query outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
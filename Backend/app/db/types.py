@@ -0,0 +1,54 @@
+import json
+from typing import List, Optional
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+# Explicitly little-endian, so a database file reads the same on any machine
+PACKED_DTYPE = np.dtype("<f4")
+
+def pack_embedding(values: List[float]) -> bytes:
+    """Pack a vector as little-endian float32 bytes"""
+    return np.asarray(values, dtype=PACKED_DTYPE).tobytes()
+
+def unpack_embedding(blob: bytes) -> List[float]:
+    return np.frombuffer(blob, dtype=PACKED_DTYPE).tolist()
+
+class Embedding(TypeDecorator):
+    """Vector column: pgvector on Postgres, packed float32 BLOB everywhere else.
+
+    Rows written before the column was migrated may still hold a JSON string;
+    those are decoded on read so callers always get a list of floats.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        super().__init__()
+        self.dim = dim
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(Vector(self.dim))
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = json.loads(value) if value else None
+            if value is None:
+                return None
+        if dialect.name == "postgresql":
+            return value
+        return pack_embedding(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return json.loads(value) if value else None
+        if isinstance(value, (bytes, memoryview)):
+            return unpack_embedding(bytes(value))
+        return value.tolist() if hasattr(value, "tolist") else list(value)
@@ -0,0 +1,20 @@
+"""DATABASE_URL may name either a blocking or an asyncio driver; both engines are derived from it."""
+from sqlalchemy.engine import URL, make_url
+
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+_ASYNC_CAPABLE = {"aiosqlite", "asyncpg", "psycopg", "psycopg_async"}
+
+def async_database_url(url: str) -> URL:
+    """URL for the request-serving AsyncEngine, e.g. sqlite:// -> sqlite+aiosqlite://"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in _ASYNC_CAPABLE or backend not in _ASYNC_DRIVERS:
+        return url
+    return url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+def sync_database_url(url: str) -> URL:
+    """URL for the blocking Engine used by Alembic, scripts and background threads"""
+    url = make_url(url)
+    if url.get_driver_name() in _ASYNC_CAPABLE - {"psycopg"}:
+        return url.set(drivername=url.get_backend_name())
+    return url
@@ -1,38 +1,66 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.token_cache import token_cache
+from app.db.session import AsyncSessionLocal
 from app.models.user import User
 from app.crud.user import get_user_by_email
-from app.schemas.auth import TokenData
+from app.schemas.auth import TokenClaims, TokenData, UserPrincipal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
 
-    user = get_user_by_email(db, email=token_data.email)
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UserPrincipal:
+    """Authenticated user as a cached snapshot; no database access on a cache hit"""
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+    payload = decode_token(token)
+    token_data = TokenData(email=payload["sub"])
+    user = await get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    principal = UserPrincipal.model_validate(user, from_attributes=True)
+    token_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+async def get_current_user(principal: UserPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)) -> User:
+    """Authenticated user as a session-bound row, for handlers that modify it"""
+    user = await db.get(User, principal.id)
+    if user is None:
+        token_cache.invalidate_user(principal.id)
+        raise credentials_exception
+    return user
+
+async def get_token_claims(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> TokenClaims:
+    """Claims-only auth for read endpoints that just need the caller's id.
+
+    Trusts the signed claims without a database lookup, so they reflect the user
+    as of login until the token expires.
+    """
+    payload = decode_token(token)
+    if "uid" not in payload:
+        # Tokens issued before the uid claim existed
+        principal = await get_current_principal(token, db)
+        return TokenClaims(id=principal.id, email=principal.email, is_admin=principal.is_admin)
+    return TokenClaims(id=payload["uid"], email=payload["sub"], is_admin=payload.get("adm", False))
@@ -1,5 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from app.api.routes import auth
 from app.api.routes import item
@@ -7,11 +9,28 @@ from app.api.routes import user
 from app.api.routes import swap
 from app.api.routes import admin
 from app.api.routes import call
+from fastapi.concurrency import run_in_threadpool
+from app.core import embeddings, metrics, moderation, similarity
+from app.core.config import settings
+from app.core.security import PasswordHasherBusy, shutdown_password_pool
+from app.db.session import async_engine
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="ReWear API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await embeddings.start_workers()
+    await moderation.start_workers()
+    yield
+    await moderation.stop_workers()
+    await embeddings.stop_workers()
+    # Nothing writes items any more: the NumPy similarity snapshot can be marked current
+    await run_in_threadpool(similarity.save)
+    shutdown_password_pool()
+    await async_engine.dispose()
+
+app = FastAPI(title="ReWear API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,6 +40,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    # Added last, so it is outermost and its timings include the other middleware
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(admin.router)
 app.include_router(swap.router)
@@ -28,6 +50,21 @@ app.include_router(auth.router)
 app.include_router(item.router)
 app.include_router(user.router)
 app.include_router(call.router)
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.get("/")
 def root():
-    return {"msg": "ReWear API is up!"}
\ No newline at end of file
+    return {"msg": "ReWear API is up!"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        """Prometheus scrape target"""
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,8 +1,19 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Text, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Text, DateTime, Index, Float, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
+from app.db.types import Embedding
+from app.core.config import settings
 import enum
+import json
+from typing import List, Optional
+
+# SQLite's CURRENT_TIMESTAMP has no fractional part; binding datetimes in the same
+# text format keeps range comparisons on date_added (keyset pagination) consistent.
+SQLITE_DATETIME = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
 
 class ItemStatus(str, enum.Enum):
     available = "available"
@@ -10,8 +21,30 @@ class ItemStatus(str, enum.Enum):
     swapped = "swapped"
     rejected = "rejected"
 
+class ModerationLabel(str, enum.Enum):
+    """Verdict of the moderation pipeline on a pending item's images"""
+    clothing = "clothing"
+    not_clothing = "not_clothing"
+    uncertain = "uncertain"  # left to an admin
+
+def parse_image_urls(images: Optional[str]) -> List[str]:
+    """The URLs in an item's `images` JSON column, ignoring malformed values"""
+    try:
+        urls = json.loads(images) if images else []
+    except json.JSONDecodeError:
+        return []
+    return [url for url in urls if isinstance(url, str) and url] if isinstance(urls, list) else []
+
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Serves the keyset-paginated catalog listing (status filter + newest-first ordering)
+        Index("ix_items_status_date_added_id", "status", "date_added", "id"),
+        Index("ix_items_status_category", "status", "category"),
+        Index("ix_items_owner_id", "owner_id"),
+        # The admin review queue: pending items the moderation pipeline couldn't decide
+        Index("ix_items_status_moderation_label", "status", "moderation_label"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -25,8 +58,53 @@ class Item(Base):
     location = Column(String)
     points = Column(Integer, default=0)
     status = Column(Enum(ItemStatus), default=ItemStatus.available)
-    date_added = Column(DateTime, default=func.now())
+    date_added = Column(DateTime().with_variant(SQLITE_DATETIME, "sqlite"), nullable=False, default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"))
-    embeddings = Column(Text, nullable=True)  # Vector embeddings stored as JSON string for SQLite compatibility
+    embeddings = Column(Embedding(settings.EMBEDDING_DIM), nullable=True)  # pgvector on Postgres, packed float32 BLOB on SQLite
+    moderation_score = Column(Float, nullable=True)  # clothing-detector confidence of the least clothing-like image
+    moderation_label = Column(String, nullable=True)  # ModerationLabel value, unset until moderated
+
+    owner = relationship("User", back_populates="items")
+# Full-text search over title, description and tags (see app/crud/item.py _text_match).
+# Outside the ORM's DDL, so both migration c81d5e07a2f4 and create_all (below) run it.
+POSTGRES_SEARCH_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(tags, ''))"
+)
+POSTGRES_SEARCH_STATEMENTS = [f"CREATE INDEX ix_items_search_tsv ON items USING GIN ({POSTGRES_SEARCH_DOCUMENT})"]
+
+SQLITE_FTS_STATEMENTS = [
+    "CREATE VIRTUAL TABLE items_fts USING fts5(title, description, tags, content='items', content_rowid='id')",
+    """
+    CREATE TRIGGER items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, title, description, tags) VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_au AFTER UPDATE OF title, description, tags ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+        INSERT INTO items_fts(rowid, title, description, tags) VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    "INSERT INTO items_fts(items_fts) VALUES ('rebuild')",
+]
+
+def search_index_statements(dialect: str) -> List[str]:
+    return {"sqlite": SQLITE_FTS_STATEMENTS, "postgresql": POSTGRES_SEARCH_STATEMENTS}.get(dialect, [])
+
+@event.listens_for(Item.__table__, "after_create")
+def _create_search_index(table, connection, **kw):
+    for statement in search_index_statements(connection.dialect.name):
+        connection.exec_driver_sql(statement)
 
-    owner = relationship("User", back_populates="items")
\ No newline at end of file
+@event.listens_for(Item.__table__, "after_drop")
+def _drop_search_index(table, connection, **kw):
+    # The GIN index goes with the table; the FTS5 table is separate
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS items_fts")
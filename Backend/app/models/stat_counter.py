@@ -0,0 +1,110 @@
+from sqlalchemy import Column, Integer, String, event, func, inspect, select
+from app.db.base_class import Base
+from app.models.item import Item, ItemStatus
+from app.models.user import User
+
+class StatCounter(Base):
+    """Running totals behind the admin stats, so reading them doesn't scan items/users.
+
+    Maintained by the mapper events below inside the same transaction as every ORM
+    insert, status change and delete; bulk UPDATE/DELETE statements must adjust them
+    with bump_counter themselves. Seeded from the rows when the table is created,
+    by migration e6c3f2a18b90 or by create_all (_seed below).
+    """
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+ITEMS = "items"
+USERS = "users"
+ADMIN_USERS = "users:admin"
+# Not a total: bumped by every change to the available items' vectors, so the NumPy
+# similarity snapshot can tell whether it is still current (see app/core/similarity.py)
+VECTOR_CHANGES = "items:vector_changes"
+
+def item_status_counter(status) -> str:
+    return f"items:{ItemStatus(status or ItemStatus.available).value}"
+
+# Every counter the admin stats read; a missing one means the table wasn't seeded
+STATS_COUNTERS = (ITEMS, USERS, ADMIN_USERS, *(item_status_counter(status) for status in ItemStatus))
+
+# On the metadata rather than the table: create_all may create stat_counters before items
+@event.listens_for(Base.metadata, "after_create")
+def _seed(metadata, connection, tables=(), **kw):
+    """Start from the current rows, as the migration does, so the totals are exact from the outset"""
+    table = StatCounter.__table__
+    if table not in tables:
+        return
+    counts = {
+        ITEMS: select(func.count()).select_from(Item),
+        USERS: select(func.count()).select_from(User),
+        ADMIN_USERS: select(func.count()).select_from(User).where(User.is_admin == True),
+    }
+    for status in ItemStatus:
+        counts[item_status_counter(status)] = select(func.count()).select_from(Item).where(Item.status == status)
+    connection.execute(table.insert(), [
+        {"name": name, "value": connection.scalar(count)} for name, count in counts.items()
+    ] + [{"name": VECTOR_CHANGES, "value": 0}])
+
+def bump_counter(connection, name: str, delta: int):
+    if not delta:
+        return
+    table = StatCounter.__table__
+    result = connection.execute(table.update().where(table.c.name == name).values(value=table.c.value + delta))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, value=delta))
+
+def bump_vector_changes(connection, delta: int = 1):
+    # Postgres serves similar items from pgvector, so nothing reads the counter there
+    if connection.dialect.name != "postgresql":
+        bump_counter(connection, VECTOR_CHANGES, delta)
+
+def _changed(target, attribute):
+    """(old, new) if the attribute changed in this flush, else None"""
+    history = inspect(target).attrs[attribute].history
+    if not history.added:
+        return None
+    return (history.deleted[0] if history.deleted else None), history.added[0]
+
+def _indexed(status) -> bool:
+    return ItemStatus(status or ItemStatus.available) == ItemStatus.available
+
+@event.listens_for(Item, "after_insert")
+def _item_inserted(mapper, connection, target):
+    bump_counter(connection, ITEMS, 1)
+    bump_counter(connection, item_status_counter(target.status), 1)
+    if _indexed(target.status) and target.embeddings is not None:
+        bump_vector_changes(connection)
+
+@event.listens_for(Item, "after_update")
+def _item_updated(mapper, connection, target):
+    change = _changed(target, "status")
+    if change and item_status_counter(change[0]) != item_status_counter(change[1]):
+        bump_counter(connection, item_status_counter(change[0]), -1)
+        bump_counter(connection, item_status_counter(change[1]), 1)
+    if (change and _indexed(change[0]) != _indexed(change[1])) or _changed(target, "embeddings"):
+        bump_vector_changes(connection)
+
+@event.listens_for(Item, "after_delete")
+def _item_deleted(mapper, connection, target):
+    bump_counter(connection, ITEMS, -1)
+    bump_counter(connection, item_status_counter(target.status), -1)
+    if _indexed(target.status):
+        bump_vector_changes(connection)
+
+@event.listens_for(User, "after_insert")
+def _user_inserted(mapper, connection, target):
+    bump_counter(connection, USERS, 1)
+    bump_counter(connection, ADMIN_USERS, 1 if target.is_admin else 0)
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    change = _changed(target, "is_admin")
+    if change and bool(change[0]) != bool(change[1]):
+        bump_counter(connection, ADMIN_USERS, 1 if change[1] else -1)
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    bump_counter(connection, USERS, -1)
+    bump_counter(connection, ADMIN_USERS, -1 if target.is_admin else 0)
\ No newline at end of file
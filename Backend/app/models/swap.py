@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum, Text, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Text, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -12,6 +12,11 @@ class SwapStatus(str, enum.Enum):
 
 class Swap(Base):
     __tablename__ = "swaps"
+    __table_args__ = (
+        # One per side of a user's swaps; crud.swap reads them as a UNION of two range scans
+        Index("ix_swaps_requester_id_status", "requester_id", "status"),
+        Index("ix_swaps_owner_id_status", "owner_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     item_id = Column(Integer, ForeignKey("items.id"))  # The item being requested
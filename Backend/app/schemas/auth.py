@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from app.schemas.user import UserOut
 
 class Token(BaseModel):
     access_token: str
@@ -9,4 +10,14 @@ class TokenData(BaseModel):
 
 class LoginRequest(BaseModel):
     email: EmailStr
-    password: str
\ No newline at end of file
+    password: str
+
+class TokenClaims(BaseModel):
+    """Identity carried by the token itself, as of when it was issued"""
+    id: int
+    email: str
+    is_admin: bool = False
+
+class UserPrincipal(UserOut):
+    """Detached snapshot of the authenticated user, safe to cache across requests"""
+    is_active: bool = True
\ No newline at end of file
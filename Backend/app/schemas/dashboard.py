@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from typing import List
 from app.schemas.item import ItemOut  # Make sure you’ve already defined this
+from app.schemas.swap import SwapDetailOut
 
 class DashboardResponse(BaseModel):
     email: str
     points: int
     items: List[ItemOut]
+    swaps: List[SwapDetailOut] = []
 
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, root_validator, validator
+from typing import Optional, List, Dict
 from enum import Enum
 from datetime import datetime
 import json
@@ -21,7 +21,6 @@ class ItemBase(BaseModel):
     images: Optional[List[str]] = None
     location: Optional[str] = None
     points: Optional[int] = None
-    embeddings: Optional[List[float]] = None
 
 class ItemCreate(ItemBase):
     pass
@@ -36,6 +35,8 @@ class ItemOut(ItemBase):
     date_added: datetime
     images: Optional[List[str]] = None
     embeddings: Optional[List[float]] = None
+    moderation_score: Optional[float] = None
+    moderation_label: Optional[str] = None
 
     @validator('images', pre=True)
     def parse_images(cls, v):
@@ -46,14 +47,67 @@ class ItemOut(ItemBase):
                 return []
         return v or []
 
-    @validator('embeddings', pre=True)
-    def parse_embeddings(cls, v):
-        if isinstance(v, str):
-            try:
-                return json.loads(v) if v else None
-            except json.JSONDecodeError:
-                return None
-        return v
-
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ItemPage(BaseModel):
+    items: List[ItemOut]
+    next_cursor: Optional[str] = None
+
+class ItemSearchFilters(BaseModel):
+    q: Optional[str] = None
+    category: Optional[List[str]] = None
+    size: Optional[List[str]] = None
+    condition: Optional[List[str]] = None
+    location: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+class ItemSearchResult(ItemPage):
+    facets: Dict[str, Dict[str, int]]
+
+
+class BulkItemFilter(BaseModel):
+    status: Optional[ItemStatus] = None
+    category: Optional[str] = None
+    owner_id: Optional[int] = None
+
+    @root_validator(skip_on_failure=True)
+    def not_empty(cls, values):
+        # An empty filter would re-status every item
+        if all(value is None for value in values.values()):
+            raise ValueError('Filter on at least one of status, category or owner_id')
+        return values
+
+class BulkStatusUpdate(BaseModel):
+    """Target status plus either explicit item IDs or a filter selecting the items"""
+    status: ItemStatus
+    item_ids: Optional[List[int]] = Field(None, min_items=1)
+    filter: Optional[BulkItemFilter] = None
+
+    @root_validator(skip_on_failure=True)
+    def ids_or_filter(cls, values):
+        if (values.get('item_ids') is None) == (values.get('filter') is None):
+            raise ValueError('Provide exactly one of item_ids or filter')
+        return values
+
+class BulkStatusResult(BaseModel):
+    status: ItemStatus
+    updated: int
+    # Per item: "updated", "unchanged" (already in the target status) or "not_found";
+    # a filter only selects items not yet in the target status
+    results: Dict[int, str]
+    # Filter matched more than BULK_MODERATION_MAX_ITEMS; repeat the request for the rest
+    truncated: bool = False
+
+class BulkImportError(BaseModel):
+    # 1-based: the line of an NDJSON upload, or the data row (after the header) of a CSV
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    # IDs of the created items, in upload order
+    item_ids: List[int]
+    # At most the first 1000 failures are listed; `failed` counts them all
+    errors: List[BulkImportError]
\ No newline at end of file
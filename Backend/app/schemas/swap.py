@@ -1,7 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, validator
+from typing import List, Optional
 from enum import Enum
 from datetime import datetime
+import json
 
 class SwapStatus(str, Enum):
     pending = "pending"
@@ -28,4 +29,42 @@ class SwapOut(SwapBase):
     date_created: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class SwapItemSummary(BaseModel):
+    id: int
+    title: str
+    images: List[str] = []
+
+    @validator('images', pre=True)
+    def parse_images(cls, v):
+        if isinstance(v, str):
+            try:
+                return json.loads(v) if v else []
+            except json.JSONDecodeError:
+                return []
+        return v or []
+
+    class Config:
+        orm_mode = True
+
+class SwapUserSummary(BaseModel):
+    id: int
+    name: str
+    avatar: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class SwapDetailOut(SwapOut):
+    """SwapOut with the item and both parties embedded; `counterpart` is the other party from the caller's side"""
+    item: Optional[SwapItemSummary] = None
+    requester: Optional[SwapUserSummary] = None
+    owner: Optional[SwapUserSummary] = None
+    counterpart: Optional[SwapUserSummary] = None
+
+    @classmethod
+    def for_viewer(cls, swap, viewer_id: int) -> "SwapDetailOut":
+        details = cls.model_validate(swap, from_attributes=True)
+        details.counterpart = details.owner if swap.requester_id == viewer_id else details.requester
+        return details
\ No newline at end of file
@@ -26,6 +26,10 @@ class UserOut(BaseModel):
     class Config:
         orm_mode = True
 
+class UserPage(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[str] = None
+
 class UserProfileUpdate(BaseModel):
     email: Optional[EmailStr] = None
     password: Optional[str] = None
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput and latency of the main API flows under concurrent load.
+
+Seeds a throwaway SQLite database (or the --database-url you give it, e.g. an empty
+Postgres) at the chosen scale, starts uvicorn on it, and drives each flow at each
+concurrency level for a fixed duration:
+    python benchmark_api.py --users 1000 --items 20000 --swaps 20000 --concurrency 1,8,32
+
+Flows:
+  - list_items:  GET /api/items/ with keyset cursors, a few pages deep
+  - login:       POST /api/auth/login (bcrypt bound; expect 503s past the hash queue)
+  - dashboard:   GET /api/users/dashboard as a random signed-in user
+  - swap:        POST /api/swaps/ then PUT .../{id} accepting it as the item's owner
+  - admin_stats: GET /api/admin/stats as the admin
+
+For each flow and level it prints requests/s and p50/p95/p99 over the successful
+requests, and writes everything, along with the commit and scale, to a JSON file under
+benchmark_results/. To check a change for regressions, run it on both commits and:
+    python benchmark_api.py --compare benchmark_results/OLD.json benchmark_results/NEW.json
+which exits non-zero when a flow got slower or lost throughput beyond --threshold percent.
+
+With --base-url it drives a server you started yourself instead; it must serve the
+database given with --database-url, which is seeded unless you pass --skip-seed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmark_results")
+PASSWORD = "benchpass"
+ADMIN_EMAIL = "bench-admin@example.com"
+FLOWS = ["list_items", "login", "dashboard", "swap", "admin_stats"]
+LIST_PAGES = 5
+LIST_PAGE_SIZE = 20
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def user_email(user_id):
+    return f"bench{user_id}@example.com"
+
+def item_owner(item_id, users):
+    return (item_id - 1) % users + 1
+
+def seed(args):
+    """Create the schema and fill it; runs in this process, with the app's models and settings"""
+    from sqlalchemy import func, insert, select, text
+
+    from app.core.security import get_password_hash, shutdown_password_pool
+    from app.db.base_class import Base
+    from app.db.session import engine
+    from app.models.item import Item, ItemStatus
+    from app.models.stat_counter import ADMIN_USERS, ITEMS, USERS, bump_counter, item_status_counter
+    from app.models.swap import Swap, SwapStatus
+    from app.models.user import User
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(User)):
+            sys.exit("The database already has users; seed an empty one, or pass --skip-seed")
+
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    # One hash for everyone: seeding stays fast, and logins still pay the full bcrypt cost
+    hashed = get_password_hash(PASSWORD)
+    shutdown_password_pool()
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    statuses = Counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": user_email(i), "hashed_password": hashed, "name": f"Bench {i}", "location": "Benchville"}
+            for i in range(1, args.users + 1)
+        ])
+        conn.execute(insert(User).values(id=args.users + 1, email=ADMIN_EMAIL, hashed_password=hashed, name="Bench Admin", is_admin=True))
+        for start in range(1, args.items + 1, args.batch_size):
+            rows = []
+            for i in range(start, min(start + args.batch_size, args.items + 1)):
+                status = ItemStatus.pending if rng.random() < 0.1 else ItemStatus.available
+                statuses[status] += 1
+                rows.append({
+                    "id": i, "title": f"Bench item {i}", "description": "Seeded by benchmark_api.py",
+                    "category": rng.choice(["tops", "bottoms", "outerwear", "shoes"]), "size": rng.choice("SML"),
+                    "condition": "good", "images": json.dumps([f"https://example.com/bench/{i}.jpg"]),
+                    "points": rng.randint(10, 50), "status": status, "owner_id": item_owner(i, args.users),
+                    "date_added": now - timedelta(seconds=args.items - i),
+                })
+            conn.execute(insert(Item), rows)
+        swap_statuses = list(SwapStatus)
+        for start in range(0, args.swaps, args.batch_size):
+            rows = []
+            for _ in range(start, min(start + args.batch_size, args.swaps)):
+                item_id = rng.randint(1, args.items)
+                owner = item_owner(item_id, args.users)
+                requester = rng.choice([u for u in rng.sample(range(1, args.users + 1), 2) if u != owner])
+                rows.append({"item_id": item_id, "requester_id": requester, "owner_id": owner, "status": rng.choice(swap_statuses)})
+            conn.execute(insert(Swap), rows)
+        # Core inserts bypass the mapper events that maintain the counters
+        counters = {USERS: args.users + 1, ADMIN_USERS: 1, ITEMS: args.items}
+        counters.update({item_status_counter(status): count for status, count in statuses.items()})
+        for name, delta in counters.items():
+            bump_counter(conn, name, delta)
+        if engine.dialect.name == "postgresql":
+            for table in ("users", "items", "swaps"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+    print(f"Seeded {args.users} users, {args.items} items, {args.swaps} swaps in {time.perf_counter() - started:.1f}s")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(args, env):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.server_workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"The server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    sys.exit("The server didn't come up within 60s")
+
+class Context:
+    """What the flows share: the scale, and tokens of a pool of signed-in users"""
+
+    def __init__(self, args):
+        self.users = args.users
+        self.items = args.items
+        self.pool = min(args.users, args.token_users)
+        self.rng = random.Random(args.seed)
+        self.tokens = {}
+        self.admin_token = None
+
+    def auth(self, user_id):
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    async def sign_in(self, client):
+        async def token(email):
+            response = await client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+            response.raise_for_status()
+            return response.json()["access_token"]
+
+        # Few at a time, so the sign-ins don't overflow the password-hashing queue
+        limit = asyncio.Semaphore(8)
+        async def sign_in_user(user_id):
+            async with limit:
+                self.tokens[user_id] = await token(user_email(user_id))
+        await asyncio.gather(*(sign_in_user(user_id) for user_id in range(1, self.pool + 1)))
+        self.admin_token = await token(ADMIN_EMAIL)
+
+    def owned_item(self, owner):
+        """A random item owned by `owner`, following the seeding's round-robin ownership"""
+        count = (self.items - owner) // self.users + 1
+        return owner + self.rng.randrange(count) * self.users
+
+async def list_items(client, ctx, state):
+    response = await client.get("/api/items/", params={"cursor": state.get("cursor", ""), "limit": LIST_PAGE_SIZE})
+    if response.status_code == 200:
+        state["page"] = state.get("page", 0) + 1
+        next_cursor = response.json()["next_cursor"]
+        if next_cursor and state["page"] < LIST_PAGES:
+            state["cursor"] = next_cursor
+        else:
+            state.clear()
+    return response.status_code
+
+async def login(client, ctx, state):
+    email = user_email(ctx.rng.randint(1, ctx.pool))
+    response = await client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+    return response.status_code
+
+async def dashboard(client, ctx, state):
+    response = await client.get("/api/users/dashboard", headers=ctx.auth(ctx.rng.randint(1, ctx.pool)))
+    return response.status_code
+
+async def swap(client, ctx, state):
+    owner, requester = ctx.rng.sample(range(1, ctx.pool + 1), 2)
+    created = await client.post("/api/swaps/", headers=ctx.auth(requester), json={
+        "item_id": ctx.owned_item(owner), "requester_id": requester, "owner_id": owner, "message": "benchmark",
+    })
+    if created.status_code != 200:
+        return created.status_code
+    accepted = await client.put(f"/api/swaps/{created.json()['id']}", headers=ctx.auth(owner), json={"status": "accepted"})
+    return accepted.status_code
+
+async def admin_stats(client, ctx, state):
+    response = await client.get("/api/admin/stats", headers={"Authorization": f"Bearer {ctx.admin_token}"})
+    return response.status_code
+
+async def drive(base_url, ctx, flow, concurrency, duration, warmup):
+    """Run `concurrency` loops of `flow` for warmup + duration seconds; only the last `duration` count"""
+    latencies, statuses = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        measure_from = time.monotonic() + warmup
+        deadline = measure_from + duration
+
+        async def loop():
+            state = {}
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await flow(client, ctx, state)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = (time.perf_counter() - started) * 1000
+                if time.monotonic() < measure_from:
+                    continue
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    total = sum(statuses.values())
+    result = {
+        "flow": flow.__name__, "concurrency": concurrency, "duration_s": duration,
+        "requests": total, "errors": total - len(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(len(latencies) / duration, 2),
+    }
+    if latencies:
+        result.update({
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+        })
+    return result
+
+def report(result):
+    if "p50_ms" not in result:
+        print(f"{result['flow']:>12} c={result['concurrency']:<4d} no successful requests, statuses {result['statuses']}")
+        return
+    errors = f"  errors={result['errors']} {result['statuses']}" if result["errors"] else ""
+    print(
+        f"{result['flow']:>12} c={result['concurrency']:<4d} {result['throughput_rps']:8.1f} req/s  "
+        f"p50={result['p50_ms']:7.1f}ms  p95={result['p95_ms']:7.1f}ms  p99={result['p99_ms']:7.1f}ms{errors}"
+    )
+
+async def run_flows(args, base_url):
+    ctx = Context(args)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await ctx.sign_in(client)
+    flows = {name: globals()[name] for name in args.flows}
+    results = []
+    for name, flow in flows.items():
+        for concurrency in args.concurrency:
+            result = await drive(base_url, ctx, flow, concurrency, args.duration, args.warmup)
+            report(result)
+            results.append(result)
+    return results
+
+def git_commit():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    commit = git("rev-parse", "HEAD")
+    return {"commit": commit or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = {(r["flow"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    print(f"{'flow':>12} {'conc':>5} {'req/s':>18} {'p95 ms':>20} {'p99 ms':>20}")
+    for result in new:
+        before = old.get((result["flow"], result["concurrency"]))
+        if before is None or "p95_ms" not in before or "p95_ms" not in result:
+            continue
+        changes = {
+            key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("throughput_rps", "p95_ms", "p99_ms")
+        }
+        regressed = changes["throughput_rps"] < -threshold or changes["p95_ms"] > threshold or changes["p99_ms"] > threshold
+        regressions += regressed
+        print(
+            f"{result['flow']:>12} {result['concurrency']:>5} "
+            + " ".join(f"{before[key]:8.1f}->{result[key]:8.1f} {changes[key]:+5.0f}%" for key in ("throughput_rps", "p95_ms", "p99_ms"))
+            + ("  REGRESSED" if regressed else "")
+        )
+    print(f"{regressions} regression(s) beyond {threshold}%")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--swaps", type=int, default=20000)
+    parser.add_argument("--flows", type=lambda s: s.split(","), default=FLOWS, help=f"comma-separated subset of {','.join(FLOWS)}")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per flow and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each measurement")
+    parser.add_argument("--token-users", type=int, default=50, help="users signed in up front and used by the flows")
+    parser.add_argument("--database-url", help="default: a new SQLite file in a temporary directory")
+    parser.add_argument("--skip-seed", action="store_true", help="the database was seeded by an earlier run")
+    parser.add_argument("--base-url", help="drive this running server instead of starting one")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the seeded hashes and the server's")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per seeding INSERT")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the data and the flows")
+    parser.add_argument("--output", help="results file (default: benchmark_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    unknown = set(args.flows) - set(FLOWS)
+    if unknown:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown))}")
+    if args.users < 2 or args.items < args.users:
+        parser.error("need at least 2 users and at least as many items as users")
+
+    tmp = tempfile.mkdtemp()
+    database_url = args.database_url or f"sqlite:///{tmp}/benchmark_api.db"
+    # Settings for this process (seeding) and the server; the model services stay off
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        SIMILARITY_INDEX_DIR=f"{tmp}/similarity_index",
+        JOB_QUEUE_PATH=f"{tmp}/job_queue.sqlite3",
+        EMBEDDING_WORKERS="0",
+        MODERATION_WORKERS="0",
+        BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+    )
+    env.setdefault("SECRET_KEY", "api-benchmark")
+    env.setdefault("TWILIO_ACCOUNT_SID", "unused")
+    env.setdefault("TWILIO_AUTH_TOKEN", "unused")
+    os.environ.update(env)
+    sys.path.insert(0, BACKEND_DIR)
+
+    if not args.skip_seed:
+        seed(args)
+    server, base_url = (None, args.base_url) if args.base_url else start_server(args, env)
+    try:
+        results = asyncio.run(run_flows(args, base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    git = git_commit()
+    from sqlalchemy.engine import make_url
+    document = {
+        "meta": {
+            **git,
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": make_url(database_url).get_backend_name(),
+            "users": args.users, "items": args.items, "swaps": args.swaps,
+            "duration_s": args.duration, "warmup_s": args.warmup, "token_users": args.token_users,
+            "server_workers": None if args.base_url else args.server_workers, "bcrypt_rounds": args.bcrypt_rounds,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(git['commit'] or 'nogit')[:8]}.json")
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
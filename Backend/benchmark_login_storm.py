@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency of non-auth endpoints while a login storm is running.
+
+Start the backend first (uvicorn app.main:app), then run:
+    python benchmark_login_storm.py --login-threads 32 --duration 20
+
+It first measures a quiet baseline, then measures again while the login threads
+hammer /api/auth/login, and prints p50/p95/p99 for both phases. Without the
+password-hashing pool the storm p99 grows to seconds. With the pool it should stay
+near the baseline, and the logins that don't fit in the queue get 503.
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+
+import requests
+
+BASE_URL = "http://localhost:8000"
+PROBE_PATHS = ["/", "/api/items/?limit=20"]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def ensure_user(email, password):
+    requests.post(f"{BASE_URL}/api/auth/register", json={"email": email, "password": password, "name": "Bench"})
+    response = requests.post(f"{BASE_URL}/api/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+
+def probe(duration, latencies):
+    session = requests.Session()
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        session.get(f"{BASE_URL}{PROBE_PATHS[i % len(PROBE_PATHS)]}")
+        latencies.append((time.perf_counter() - started) * 1000)
+        i += 1
+
+def login_storm(stop, email, password, statuses):
+    session = requests.Session()
+    while not stop.is_set():
+        response = session.post(f"{BASE_URL}/api/auth/login", data={"username": email, "password": password})
+        statuses[response.status_code] += 1
+
+def report(name, latencies):
+    print(
+        f"{name:>8}: n={len(latencies):5d}  p50={statistics.median(latencies):7.1f}ms  "
+        f"p95={percentile(latencies, 95):7.1f}ms  p99={percentile(latencies, 99):7.1f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--login-threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    email, password = "bench-storm@example.com", "benchpass123"
+    ensure_user(email, password)
+
+    print(f"Measuring baseline for {args.duration:.0f}s...")
+    baseline = []
+    probe(args.duration, baseline)
+
+    print(f"Measuring during a login storm ({args.login_threads} threads) for {args.duration:.0f}s...")
+    stop = threading.Event()
+    statuses = Counter()
+    stormers = [
+        threading.Thread(target=login_storm, args=(stop, email, password, statuses), daemon=True)
+        for _ in range(args.login_threads)
+    ]
+    for thread in stormers:
+        thread.start()
+    time.sleep(1)  # let the storm build up
+    storm = []
+    probe(args.duration, storm)
+    stop.set()
+    for thread in stormers:
+        thread.join()
+
+    print()
+    report("baseline", baseline)
+    report("storm", storm)
+    print(f"   logins: {dict(statuses)} ({sum(statuses.values()) / (args.duration + 1):.1f}/s)")
+
+if __name__ == "__main__":
+    main()
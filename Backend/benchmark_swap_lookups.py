@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-user swap lookups (the /api/swaps/ and /history queries) on a large table.
+
+Needs no running server; it fills a throwaway SQLite database and queries it directly:
+    python benchmark_swap_lookups.py --swaps 1000000 --lookups 200
+
+It times three variants for the same random users:
+  - the old OR query, on a table without the swap indexes
+  - the old OR query, with the (requester_id, status) / (owner_id, status) indexes
+  - the UNION query crud.swap now issues, with the indexes
+and prints the p50/p95 of each plus the speedup over the first.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/swap_lookups.db"
+os.environ.setdefault("SECRET_KEY", "swap-lookup-benchmark")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "unused")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "unused")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.crud.swap import _user_swap_ids, _with_details
+from app.db.base_class import Base
+from app.db.session import engine
+from app.models import item, stat_counter, user  # noqa: F401  (register the tables)
+from app.models.swap import Swap, SwapStatus
+
+SWAP_INDEXES = ["ix_swaps_requester_id_status", "ix_swaps_owner_id_status", "ix_items_owner_id"]
+STATUSES = [status.value for status in SwapStatus]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def populate(swaps, users, items):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, hashed_password, name) VALUES (:id, :email, 'x', :name)"), [
+            {"id": i, "email": f"bench{i}@example.com", "name": f"Bench {i}"} for i in range(1, users + 1)
+        ])
+        conn.execute(text("INSERT INTO items (id, title, owner_id, status) VALUES (:id, :title, :owner, 'available')"), [
+            {"id": i, "title": f"Item {i}", "owner": rng.randint(1, users)} for i in range(1, items + 1)
+        ])
+        batch = []
+        for i in range(1, swaps + 1):
+            requester, owner = rng.sample(range(1, users + 1), 2)
+            batch.append({
+                "item": rng.randint(1, items), "requester": requester, "owner": owner,
+                "status": rng.choice(STATUSES),
+            })
+            if len(batch) == 50_000 or i == swaps:
+                conn.execute(text(
+                    "INSERT INTO swaps (item_id, requester_id, owner_id, status) "
+                    "VALUES (:item, :requester, :owner, :status)"
+                ), batch)
+                batch = []
+        conn.execute(text("ANALYZE"))
+
+def or_query(user_id, history):
+    conditions = [(Swap.requester_id == user_id) | (Swap.owner_id == user_id)]
+    if history:
+        conditions.append(Swap.status != SwapStatus.pending)
+    return _with_details(select(Swap)).where(*conditions)
+
+def union_query(user_id, history):
+    conditions = [Swap.status != SwapStatus.pending] if history else []
+    return _with_details(select(Swap)).where(Swap.id.in_(_user_swap_ids(user_id, *conditions)))
+
+def measure(build, user_ids):
+    latencies = []
+    with Session(engine) as db:
+        for i, user_id in enumerate(user_ids):
+            started = time.perf_counter()
+            db.scalars(build(user_id, history=bool(i % 2))).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+    return latencies
+
+def report(name, latencies, baseline=None):
+    p50 = statistics.median(latencies)
+    speedup = f"  {statistics.median(baseline) / p50:6.1f}x" if baseline else ""
+    print(f"{name:>18}: p50={p50:8.2f}ms  p95={percentile(latencies, 95):8.2f}ms{speedup}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--swaps", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Populating {args.swaps} swaps between {args.users} users...")
+    populate(args.swaps, args.users, args.items)
+    user_ids = [random.randint(1, args.users) for _ in range(args.lookups)]
+
+    with engine.begin() as conn:
+        for name in SWAP_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+    unindexed = measure(or_query, user_ids)
+
+    with engine.begin() as conn:
+        for index in list(Swap.__table__.indexes) + list(item.Item.__table__.indexes):
+            if index.name in SWAP_INDEXES:
+                index.create(conn)
+        conn.execute(text("ANALYZE"))
+    indexed_or = measure(or_query, user_ids)
+    indexed_union = measure(union_query, user_ids)
+
+    print()
+    report("OR, no indexes", unindexed)
+    report("OR, indexed", indexed_or, unindexed)
+    report("UNION, indexed", indexed_union, unindexed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Shared setup for the in-process tests (test_query_counts.py, test_swap_acceptance.py, ...).
+
+Unlike the test_*.py scripts that call a live server, these drive the app in-process
+against a throwaway SQLite database, with the model services and their workers off.
+The settings are read once per process, so this runs before any app module is imported.
+"""
+import os
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/tests.db"
+os.environ["SIMILARITY_INDEX_DIR"] = f"{_tmp}/similarity_index"
+os.environ["JOB_QUEUE_PATH"] = f"{_tmp}/job_queue.sqlite3"
+os.environ["EMBEDDING_WORKERS"] = "0"
+os.environ["MODERATION_WORKERS"] = "0"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ.setdefault("SECRET_KEY", "in-process-tests")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "unused")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "unused")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models import item, stat_counter, swap, user  # noqa: F401  (register the tables)
+
+@pytest.fixture(scope="module")
+def client():
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as client:
+        yield client
+
+def sign_up(client, email, admin=False):
+    """Register and sign in; returns (user id, auth headers)"""
+    client.post("/api/auth/register", json={"email": email, "password": "pw", "name": email.split("@")[0]})
+    if admin:
+        # Before the first login, so no cached principal predates it
+        with SessionLocal() as db:
+            db.query(user.User).filter_by(email=email).one().is_admin = True
+            db.commit()
+    token = client.post("/api/auth/login", data={"username": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    return client.get("/api/auth/me", headers=headers).json()["id"], headers
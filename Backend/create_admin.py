@@ -10,6 +10,7 @@ from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.item import Item  # Import Item model to fix relationship
 from app.models.swap import Swap  # Import Swap model to fix relationship
+from app.models.stat_counter import StatCounter  # Registers the admin stats counter hooks
 from app.core.security import get_password_hash
 
 def create_admin_user():
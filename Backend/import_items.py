@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Bulk-import a partner shop's catalog from an NDJSON or CSV file:
+    python import_items.py catalog.ndjson --owner shop@example.com
+    python import_items.py catalog.csv --owner shop@example.com
+    cat catalog.csv | python import_items.py - --owner shop@example.com --format csv
+
+Same validation and batched inserts as POST /api/items/bulk. The items are created
+pending approval and queued for embedding and moderation, which the server's workers
+pick up. Exits non-zero if any row was rejected.
+"""
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '.'))
+
+from app.db.session import AsyncSessionLocal, async_engine
+from app.models.user import User  # noqa: F401
+from app.models.item import Item  # noqa: F401
+from app.models.swap import Swap  # noqa: F401  (Import models to fix relationships)
+from app.models.stat_counter import StatCounter  # noqa: F401  (Registers the admin stats counter hooks)
+from app.core.bulk_import import iterate_chunks
+from app.crud import item as crud_item
+from app.crud.user import get_user_by_email
+
+CHUNK_BYTES = 1024 * 1024
+
+def read_chunks(stream):
+    while True:
+        chunk = stream.read(CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+async def import_items(path: str, owner_email: str, format: str):
+    try:
+        async with AsyncSessionLocal() as db:
+            owner = await get_user_by_email(db, owner_email)
+            if owner is None:
+                print(f"No user with email {owner_email}")
+                return None
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+            try:
+                return await crud_item.bulk_create_items(db, iterate_chunks(read_chunks(stream)), format, owner.id)
+            finally:
+                if stream is not sys.stdin.buffer:
+                    stream.close()
+    finally:
+        await async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help='NDJSON or CSV file, or "-" for stdin')
+    parser.add_argument("--owner", required=True, help="email of the user who will own the items")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="default: from the file extension, else ndjson")
+    args = parser.parse_args()
+    format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    try:
+        result = asyncio.run(import_items(args.path, args.owner, format))
+    except crud_item.BulkImportTooLarge as e:
+        print(f"Import aborted, nothing was created: {e.__doc__}")
+        sys.exit(1)
+    if result is None:
+        sys.exit(1)
+    print(f"Created {result['created']} items, rejected {result['failed']} rows")
+    for error in result["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+    if result["failed"] > len(result["errors"]):
+        print(f"  ... and {result['failed'] - len(result['errors'])} more")
+    sys.exit(1 if result["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
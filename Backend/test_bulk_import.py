@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Bulk item import: who may call POST /api/items/bulk, what it creates and reports, and
+that no transaction is open while the upload is still being read.
+    python -m pytest test_bulk_import.py
+"""
+import asyncio
+import json
+
+from app.core.config import settings
+from app.crud import item as crud_item
+from app.db.session import AsyncSessionLocal
+from conftest import sign_up
+
+def ndjson(*rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+def test_bulk_import_is_for_admins(client):
+    _, headers = sign_up(client, "bulk-user@example.com")
+    response = client.post("/api/items/bulk", content=ndjson({"title": "Scarf"}), headers=headers)
+    assert response.status_code == 403
+
+def test_bulk_import_creates_valid_rows_for_the_owner(client):
+    shop_id, shop_headers = sign_up(client, "bulk-shop@example.com")
+    _, admin_headers = sign_up(client, "bulk-admin@example.com", admin=True)
+    body = "title,points,images\nScarf,10,http://img/scarf.jpg|http://img/scarf2.jpg\n,5,\nBoots,,\n"
+
+    response = client.post(
+        "/api/items/bulk", params={"owner_id": shop_id}, content=body,
+        headers={**admin_headers, "Content-Type": "text/csv"},
+    )
+
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 1)
+    assert result["errors"][0]["row"] == 2
+    items = [client.get(f"/api/items/{item_id}", headers=admin_headers).json() for item_id in result["item_ids"]]
+    assert [(i["title"], i["points"], i["owner_id"], i["status"]) for i in items] == [
+        ("Scarf", 10, shop_id, "pending"), ("Boots", 0, shop_id, "pending"),
+    ]
+    assert items[0]["images"] == ["http://img/scarf.jpg", "http://img/scarf2.jpg"]
+
+def test_bulk_import_rejects_unknown_owner_and_oversized_uploads(client, monkeypatch):
+    _, admin_headers = sign_up(client, "bulk-admin2@example.com", admin=True)
+    response = client.post("/api/items/bulk", params={"owner_id": 10**9}, content=ndjson({"title": "Hat"}), headers=admin_headers)
+    assert response.status_code == 404
+
+    monkeypatch.setattr(settings, "BULK_IMPORT_MAX_ROWS", 2)
+    before = client.get("/api/admin/stats", headers=admin_headers).json()
+    body = ndjson({"title": "Hat"}, {"title": "Cap"}, {"title": "Beanie"})
+    assert client.post("/api/items/bulk", content=body, headers=admin_headers).status_code == 413
+    assert client.get("/api/admin/stats", headers=admin_headers).json() == before
+
+def test_upload_is_read_before_the_transaction_opens(client, monkeypatch):
+    owner_id, _ = sign_up(client, "bulk-stream@example.com")
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 2)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            async def chunks():
+                for i in range(5):
+                    assert not db.in_transaction()
+                    yield (json.dumps({"title": f"Tee {i}"}) + "\n").encode()
+                    await asyncio.sleep(0)
+            return await crud_item.bulk_create_items(db, chunks(), "ndjson", owner_id)
+
+    assert asyncio.run(run())["created"] == 5
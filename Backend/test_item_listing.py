@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Catalog listing and search: keyset pages of approved items, newest first, full-text
+matches and facet counts.
+    python -m pytest test_item_listing.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app.db.session import SessionLocal
+from app.models.item import Item, ItemStatus
+from conftest import sign_up
+
+@pytest.fixture(scope="module")
+def catalog(client):
+    """Available items sharing creation times (so ids break the ties), newest first"""
+    owner_id, _ = sign_up(client, "listing-owner@example.com")
+    start = datetime(2031, 1, 1)
+    rows = [
+        {"title": f"Listing {i}", "status": ItemStatus.available, "owner_id": owner_id, "date_added": start + timedelta(minutes=i // 3)}
+        for i in range(25)
+    ]
+    rows.append({"title": "Pending", "status": ItemStatus.pending, "owner_id": owner_id, "date_added": start})
+    with SessionLocal() as db:
+        db.execute(insert(Item), rows)
+        db.commit()
+    return ["Listing %d" % i for i in sorted(range(25), key=lambda i: (i // 3, i), reverse=True)]
+
+def pages(client, path, limit, **params):
+    titles, cursor = [], ""
+    while cursor is not None:
+        page = client.get(path, params={**params, "cursor": cursor, "limit": limit}).json()
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    return titles
+
+def test_keyset_pages_walk_the_catalog_newest_first(client, catalog):
+    titles = [title for title in pages(client, "/api/items/", limit=4) if title.startswith("Listing ")]
+    assert titles == catalog
+
+@pytest.mark.parametrize("path", ["/api/items/", "/api/items/search"])
+@pytest.mark.parametrize("limit", [0, 101])
+def test_page_size_is_bounded(client, path, limit):
+    assert client.get(path, params={"cursor": "", "limit": limit}).status_code == 422
+
+def test_malformed_cursor_is_rejected(client):
+    assert client.get("/api/items/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+@pytest.fixture(scope="module")
+def wardrobe(client):
+    owner_id, _ = sign_up(client, "search-owner@example.com")
+    rows = [
+        ("Quokka wool coat", "Warm winter coat", "outerwear", "M", "good", "wool,winter"),
+        ("Quokka rain jacket", "Light and waterproof", "outerwear", "L", "new", "rain"),
+        ("Linen shirt", "Summer quokkawear", "tops", "M", "good", None),
+        ("Quokka scarf", "Knitted", "accessories", None, "worn", "wool"),
+    ]
+    with SessionLocal() as db:
+        ids = db.scalars(insert(Item).returning(Item.id, sort_by_parameter_order=True), [
+            {"title": title, "description": description, "category": category, "size": size, "condition": condition,
+             "tags": tags, "status": ItemStatus.available, "owner_id": owner_id, "date_added": datetime(2030, 6, 1 + i)}
+            for i, (title, description, category, size, condition, tags) in enumerate(rows)
+        ]).all()
+        db.commit()
+    return ids
+
+def search(client, **params):
+    return client.get("/api/items/search", params=params).json()
+
+def test_search_matches_words_and_prefixes_newest_first(client, wardrobe):
+    coat, jacket, shirt, scarf = wardrobe
+    assert [item["id"] for item in search(client, q="quokka")["items"]] == [scarf, shirt, jacket, coat]
+    assert [item["id"] for item in search(client, q="quokka wool")["items"]] == [scarf, coat]
+    assert [item["id"] for item in search(client, q="waterpr")["items"]] == [jacket]
+    assert search(client, q='quokka" OR "')["items"] == []
+
+def test_search_follows_edits_and_deletes(client, wardrobe):
+    owner_id, _ = sign_up(client, "search-owner@example.com")
+    with SessionLocal() as db:
+        item_id = db.scalar(insert(Item).returning(Item.id).values(
+            title="Wombat beanie", status=ItemStatus.available, owner_id=owner_id, date_added=datetime(2030, 1, 1)
+        ))
+        db.commit()
+        assert [item["id"] for item in search(client, q="wombat")["items"]] == [item_id]
+
+        db.execute(update(Item).where(Item.id == item_id).values(title="Koala beanie"))
+        db.commit()
+        assert search(client, q="wombat")["items"] == []
+        assert [item["id"] for item in search(client, q="koala")["items"]] == [item_id]
+
+        db.execute(delete(Item).where(Item.id == item_id))
+        db.commit()
+        assert search(client, q="koala")["items"] == []
+
+def test_facets_count_the_whole_filtered_result(client, wardrobe):
+    result = search(client, q="quokka", limit=1)
+    assert len(result["items"]) == 1 and result["next_cursor"]
+    assert result["facets"] == {
+        "category": {"outerwear": 2, "tops": 1, "accessories": 1},
+        "size": {"M": 2, "L": 1},
+        "condition": {"good": 2, "new": 1, "worn": 1},
+    }
+    assert search(client, q="quokka", size="M")["facets"]["category"] == {"outerwear": 1, "tops": 1}
+    # Later pages skip the facets
+    assert search(client, q="quokka", cursor=result["next_cursor"])["facets"] == {}
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Job queue semantics: coalescing by (kind, key), versions, leases and retries. Each test
+gets its own queue file and a clock it moves by hand.
+    python -m pytest test_job_queue.py
+"""
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import job_queue
+from app.core.config import settings
+from app.core.job_queue import JobQueue, WorkerPool
+
+LEASE = 60.0
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(job_queue, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+def test_enqueue_coalesces_and_bumps_the_version(queue):
+    queue.enqueue("embed", 1, {"n": 1})
+    queue.enqueue("embed", 1, {"n": 2})
+    queue.enqueue_many("embed", [(1, {"n": 3})], replace=False)
+
+    [job] = queue.claim("embed", 10, LEASE)
+    assert (job.key, job.payload, job.version) == ("1", {"n": 2}, 1)
+    assert queue.counts() == {"embed": {"queued": 1, "retrying": 0}}
+
+def test_claims_are_per_kind_and_leased(queue, clock):
+    queue.enqueue_many("embed", [(1, None), (2, None)])
+    queue.enqueue("moderate", 1)
+
+    assert {job.key for job in queue.claim("embed", 10, LEASE)} == {"1", "2"}
+    assert queue.claim("embed", 10, LEASE) == []
+    assert [job.kind for job in queue.claim("moderate", 10, LEASE)] == ["moderate"]
+
+    # A worker that died keeps its jobs only until the lease runs out
+    clock.now += LEASE + 1
+    assert {job.key for job in queue.claim("embed", 10, LEASE)} == {"1", "2"}
+
+def test_complete_keeps_a_job_enqueued_while_running(queue):
+    queue.enqueue_many("embed", [(1, None), (2, None)])
+    jobs = queue.claim("embed", 10, LEASE)
+    queue.enqueue("embed", 1)
+
+    queue.complete(jobs)
+
+    assert queue.counts() == {"embed": {"queued": 1, "retrying": 0}}
+    [job] = queue.claim("embed", 10, LEASE)
+    assert (job.key, job.version) == ("1", 1)
+
+def test_retry_backs_off_exponentially(queue, clock):
+    queue.enqueue("embed", 1)
+    for attempt in range(3):
+        [job] = queue.claim("embed", 10, LEASE)
+        assert job.attempts == attempt
+        queue.retry([job], "detector down")
+
+        delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** attempt
+        clock.now += delay - 1
+        assert queue.claim("embed", 10, LEASE) == []
+        clock.now += 1
+    assert queue.counts() == {"embed": {"queued": 1, "retrying": 1}}
+
+def test_retry_of_a_stale_version_leaves_the_new_one_due(queue):
+    queue.enqueue("embed", 1)
+    [old] = queue.claim("embed", 10, LEASE)
+    queue.enqueue("embed", 1)
+
+    queue.retry([old], "detector down")
+
+    [job] = queue.claim("embed", 10, LEASE)
+    assert (job.version, job.attempts) == (1, 0)
+
+def test_release_does_not_count_an_attempt(queue):
+    queue.enqueue("embed", 1)
+    queue.release(queue.claim("embed", 10, LEASE))
+
+    [job] = queue.claim("embed", 10, LEASE)
+    assert job.attempts == 0
+
+def test_worker_pool_retries_a_batch_whose_handler_raises(queue, clock, monkeypatch, caplog):
+    monkeypatch.setattr(job_queue, "get_job_queue", lambda: queue)
+    queue.enqueue_many("embed", [(1, None), (2, None), (3, None)])
+    handled = []
+
+    async def handler(jobs):
+        handled.append(sorted(job.key for job in jobs))
+        if len(handled) == 1:
+            raise RuntimeError("service unreachable")
+        return [job for job in jobs if job.key == "3"]
+
+    async def run():
+        pool = WorkerPool("embed", handler, workers=1, batch_size=10, poll_interval=0.01)
+        pool.start()
+        await asyncio.sleep(0.1)
+        clock.now += settings.JOB_RETRY_BASE_SECONDS
+        await asyncio.sleep(0.1)
+        await pool.stop()
+
+    with caplog.at_level(logging.ERROR, logger=job_queue.__name__):
+        asyncio.run(run())
+
+    assert handled == [["1", "2", "3"], ["1", "2", "3"]]
+    assert "embed jobs failed" in caplog.text and "service unreachable" in caplog.text
+    assert queue.counts() == {"embed": {"queued": 1, "retrying": 1}}
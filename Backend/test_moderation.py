@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Moderation pipeline against a stubbed clothing detector: approve, reject, uncertain,
+and a detector that can't be reached, plus what each leaves in the admin review queue.
+    python -m pytest test_moderation.py
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.core import moderation
+from app.core.config import settings
+from app.core.job_queue import Job
+from conftest import sign_up
+
+# Detector confidence per image URL
+CONFIDENCE = {
+    "http://img/shirt.jpg": 0.97,
+    "http://img/dress.jpg": 0.93,
+    "http://img/cat.jpg": 0.02,
+    "http://img/blurry.jpg": 0.5,
+}
+
+def detector(request):
+    urls = json.loads(request.content)["image_urls"]
+    lines = [json.dumps({"index": i, "confidence": CONFIDENCE.get(url)}) for i, url in enumerate(urls)]
+    return httpx.Response(200, text="\n".join(lines) + "\n")
+
+def unreachable(request):
+    raise httpx.ConnectError("Connection refused", request=request)
+
+@pytest.fixture
+def stub_detector(monkeypatch):
+    def install(handler):
+        monkeypatch.setattr(moderation, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return install
+
+@pytest.fixture(scope="module")
+def owner(client):
+    return sign_up(client, "moderation-owner@example.com")
+
+@pytest.fixture(scope="module")
+def admin(client):
+    return sign_up(client, "moderation-admin@example.com", admin=True)
+
+def add_item(client, owner, *images):
+    return client.post("/api/items/", json={"title": "Listing", "images": list(images)}, headers=owner[1]).json()["id"]
+
+def moderate(item_ids, attempts=0):
+    jobs = [Job(moderation.MODERATE_JOB, str(item_id), None, attempts, 0) for item_id in item_ids]
+    return [int(job.key) for job in asyncio.run(moderation.moderate_items(jobs))]
+
+def item(client, admin, item_id):
+    return client.get(f"/api/items/{item_id}", headers=admin[1]).json()
+
+def review_queue(client, admin, item_ids):
+    rows = client.get("/api/admin/items/pending", params={"review_only": True}, headers=admin[1]).json()
+    return [row["id"] for row in rows if row["id"] in item_ids]
+
+def test_verdicts_decide_clear_cases_and_queue_the_rest(client, owner, admin, stub_detector):
+    stub_detector(detector)
+    approved = add_item(client, owner, "http://img/shirt.jpg", "http://img/dress.jpg")
+    rejected = add_item(client, owner, "http://img/cat.jpg")
+    uncertain = add_item(client, owner, "http://img/shirt.jpg", "http://img/blurry.jpg")
+
+    assert moderate([approved, rejected, uncertain]) == []
+
+    assert item(client, admin, approved)["status"] == "available"
+    assert item(client, admin, approved)["moderation_label"] == "clothing"
+    assert item(client, admin, rejected)["status"] == "rejected"
+    assert item(client, admin, rejected)["moderation_label"] == "not_clothing"
+    uncertain_item = item(client, admin, uncertain)
+    assert (uncertain_item["status"], uncertain_item["moderation_label"], uncertain_item["moderation_score"]) == ("pending", "uncertain", 0.5)
+    assert review_queue(client, admin, {approved, rejected, uncertain}) == [uncertain]
+
+def test_unreachable_detector_retries_then_leaves_the_item_to_an_admin(client, owner, admin, stub_detector):
+    scored = add_item(client, owner, "http://img/blurry.jpg")
+    stuck = add_item(client, owner, "http://img/shirt.jpg")
+    stub_detector(detector)
+    moderate([scored])
+
+    # Not labelled yet, but already in front of the admins, ahead of the scored items
+    stub_detector(unreachable)
+    assert moderate([stuck]) == [stuck]
+    assert item(client, admin, stuck)["moderation_label"] is None
+    assert review_queue(client, admin, {scored, stuck}) == [stuck, scored]
+
+    assert moderate([stuck], attempts=settings.MODERATION_MAX_ATTEMPTS - 1) == []
+    stuck_item = item(client, admin, stuck)
+    assert (stuck_item["status"], stuck_item["moderation_label"], stuck_item["moderation_score"]) == ("pending", "uncertain", None)
+    assert review_queue(client, admin, {scored, stuck}) == [stuck, scored]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Query-count regression tests: listing endpoints must issue a fixed number of SQL
+statements however many rows they return (no N+1 lazy loads).
+
+Unlike the other test_*.py scripts this one needs no running server; it drives the
+app in-process against a throwaway SQLite database (see conftest.py):
+    python -m pytest test_query_counts.py
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.db.session import async_engine
+from conftest import sign_up
+
+@contextmanager
+def count_queries():
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def add_swaps(client, owner, requester, count):
+    owner_id, owner_headers = owner
+    requester_id, requester_headers = requester
+    for i in range(count):
+        item_id = client.post(
+            "/api/items/", json={"title": f"Jacket {i}", "images": [f"http://img/{i}.jpg"]}, headers=owner_headers
+        ).json()["id"]
+        client.post(
+            "/api/swaps/",
+            json={"item_id": item_id, "requester_id": requester_id, "owner_id": owner_id},
+            headers=requester_headers,
+        )
+
+@pytest.mark.parametrize("path", ["/api/swaps/", "/api/users/dashboard"])
+def test_listing_query_count_is_constant(client, path):
+    owner = sign_up(client, f"owner{path.replace('/', '-')}@example.com")
+    requester = sign_up(client, f"requester{path.replace('/', '-')}@example.com")
+
+    counts = []
+    for batch in (2, 20):
+        add_swaps(client, owner, requester, batch)
+        client.get(path, headers=owner[1])  # warm the token cache
+        with count_queries() as statements:
+            response = client.get(path, headers=owner[1])
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1], f"{path} issued {counts} queries for 2 vs 22 swaps"
+    assert counts[1] <= 2
+
+def test_swap_listing_embeds_item_and_counterpart(client):
+    owner = sign_up(client, "embed-owner@example.com")
+    requester = sign_up(client, "embed-requester@example.com")
+    add_swaps(client, owner, requester, 1)
+
+    [swap] = client.get("/api/swaps/", headers=requester[1]).json()
+    assert swap["item"]["title"] == "Jacket 0"
+    assert swap["item"]["images"] == ["http://img/0.jpg"]
+    assert swap["counterpart"] == {"id": owner[0], "name": "embed-owner", "avatar": None}
+    assert client.get("/api/swaps/history", headers=requester[1]).json() == []
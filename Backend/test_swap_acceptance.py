@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Concurrency tests for swap acceptance: parallel accepts must credit points exactly once
+per swap, and parallel swaps of the same user must not lose each other's points.
+
+Like test_query_counts.py this needs no running server; it drives the app in-process
+against a throwaway SQLite database (see conftest.py):
+    python -m pytest test_swap_acceptance.py
+"""
+import asyncio
+
+from app.crud import swap as crud_swap
+from app.db.session import AsyncSessionLocal
+from app.schemas.swap import SwapUpdate
+from conftest import sign_up
+
+PARALLEL_ACCEPTS = 10
+
+def request_swap(client, owner, requester, points):
+    owner_id, owner_headers = owner
+    requester_id, requester_headers = requester
+    item_id = client.post(
+        "/api/items/", json={"title": "Coat", "points": points, "images": ["http://img/coat.jpg"]}, headers=owner_headers
+    ).json()["id"]
+    return client.post(
+        "/api/swaps/",
+        json={"item_id": item_id, "requester_id": requester_id, "owner_id": owner_id},
+        headers=requester_headers,
+    ).json()["id"]
+
+def me(client, user):
+    return client.get("/api/auth/me", headers=user[1]).json()
+
+async def accept(swap_id):
+    # Each accept gets its own session, as concurrent requests would
+    async with AsyncSessionLocal() as db:
+        return await crud_swap.update_swap(db, swap_id, SwapUpdate(status="accepted"))
+
+async def accept_all(swap_ids):
+    return await asyncio.gather(*(accept(swap_id) for swap_id in swap_ids))
+
+def test_parallel_accepts_of_one_swap_credit_once(client):
+    owner = sign_up(client, "race-owner@example.com")
+    requester = sign_up(client, "race-requester@example.com")
+    swap_id = request_swap(client, owner, requester, points=40)
+
+    swaps = asyncio.run(accept_all([swap_id] * PARALLEL_ACCEPTS))
+
+    assert all(s.status == "accepted" for s in swaps)
+    for user in (owner, requester):
+        stats = me(client, user)
+        assert (stats["points"], stats["swaps_completed"], stats["impact_score"]) == (40, 1, 10)
+
+def test_parallel_swaps_of_one_user_keep_every_credit(client):
+    owner = sign_up(client, "busy-owner@example.com")
+    requesters = [sign_up(client, f"busy-requester{i}@example.com") for i in range(PARALLEL_ACCEPTS)]
+    swap_ids = [request_swap(client, owner, requester, points=i + 1) for i, requester in enumerate(requesters)]
+
+    asyncio.run(accept_all(swap_ids))
+
+    stats = me(client, owner)
+    assert stats["points"] == sum(range(1, PARALLEL_ACCEPTS + 1))
+    assert stats["swaps_completed"] == PARALLEL_ACCEPTS
+    assert [me(client, r)["points"] for r in requesters] == list(range(1, PARALLEL_ACCEPTS + 1))
+
+def test_accept_through_the_api_refreshes_cached_stats(client):
+    owner = sign_up(client, "api-owner@example.com")
+    requester = sign_up(client, "api-requester@example.com")
+    swap_id = request_swap(client, owner, requester, points=15)
+    me(client, owner)  # cache the owner's token
+
+    response = client.put(f"/api/swaps/{swap_id}", json={"status": "accepted"}, headers=owner[1])
+    assert response.status_code == 200
+    assert response.json()["status"] == "accepted"
+    assert me(client, owner)["points"] == 15
+
+    # Accepting again is a no-op
+    client.put(f"/api/swaps/{swap_id}", json={"status": "accepted"}, headers=owner[1])
+    assert me(client, owner)["points"] == 15
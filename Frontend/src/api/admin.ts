@@ -11,6 +11,13 @@ export interface AdminStats {
   admin_users: number;
 }
 
+export interface BulkStatusResult {
+  status: string;
+  updated: number;
+  results: Record<string, 'updated' | 'unchanged' | 'not_found'>;
+  truncated: boolean;
+}
+
 export const adminApi = {
   async getStats() {
     const result = await apiClient.get<AdminStats>('/api/admin/stats');
@@ -60,6 +67,17 @@ export const adminApi = {
     return result.data!;
   },
 
+  async bulkUpdateStatus(status: string, itemIds: number[]) {
+    const result = await apiClient.post<BulkStatusResult>('/api/admin/items/bulk-status', {
+      status,
+      item_ids: itemIds,
+    });
+    if (result.error) {
+      throw new Error(result.error);
+    }
+    return result.data!;
+  },
+
   async deleteItem(itemId: number) {
     const result = await apiClient.delete(`/api/admin/items/${itemId}`);
     if (result.error) {
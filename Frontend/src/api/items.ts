@@ -15,6 +15,8 @@ export interface Item {
   status: 'available' | 'pending' | 'swapped' | 'rejected';
   owner_id: number;
   date_added: string;
+  moderation_score?: number | null;
+  moderation_label?: 'clothing' | 'not_clothing' | 'uncertain' | null;
 }
 
 export interface ItemCreate {
@@ -44,6 +46,22 @@ export interface ItemUpdate {
   status?: 'available' | 'pending' | 'swapped' | 'rejected';
 }
 
+export interface ItemSearchParams {
+  query?: string;
+  category?: string;
+  size?: string;
+  condition?: string;
+  location?: string;
+  cursor?: string;
+  limit?: number;
+}
+
+export interface ItemSearchResult {
+  items: Item[];
+  next_cursor: string | null;
+  facets: Record<string, Record<string, number>>;
+}
+
 export const itemsApi = {
   async getAll(skip = 0, limit = 10) {
     const result = await apiClient.get<Item[]>(`/api/items?skip=${skip}&limit=${limit}`);
@@ -53,6 +71,22 @@ export const itemsApi = {
     return result.data!;
   },
 
+  async search(params: ItemSearchParams) {
+    const query = new URLSearchParams();
+    if (params.query) query.set('q', params.query);
+    if (params.category) query.set('category', params.category);
+    if (params.size) query.set('size', params.size);
+    if (params.condition) query.set('condition', params.condition);
+    if (params.location) query.set('location', params.location);
+    if (params.cursor) query.set('cursor', params.cursor);
+    query.set('limit', String(params.limit ?? 20));
+    const result = await apiClient.get<ItemSearchResult>(`/api/items/search?${query.toString()}`);
+    if (result.error) {
+      throw new Error(result.error);
+    }
+    return result.data!;
+  },
+
   async getById(id: number) {
     const result = await apiClient.get<Item>(`/api/items/${id}`);
     if (result.error) {
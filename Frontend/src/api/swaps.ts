@@ -1,5 +1,11 @@
 import apiClient from './client';
 
+export interface SwapParty {
+  id: number;
+  name: string;
+  avatar?: string | null;
+}
+
 export interface SwapRequest {
   id: number;
   item_id: number;
@@ -8,6 +14,11 @@ export interface SwapRequest {
   status: 'pending' | 'accepted' | 'rejected' | 'completed';
   message?: string;
   date_created: string;
+  // Embedded by the listing endpoints
+  item?: { id: number; title: string; images: string[] } | null;
+  requester?: SwapParty | null;
+  owner?: SwapParty | null;
+  counterpart?: SwapParty | null;
 }
 
 export interface SwapCreate {